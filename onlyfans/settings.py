@@ -42,11 +42,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'web.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'web.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'web.middleware.CachedAuthenticationMiddleware',
+    'web.middleware.GuestCartMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,15 +58,25 @@ ROOT_URLCONF = 'onlyfans.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'web.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')], # Cambio aquí
-        'APP_DIRS': True,
+        # Sin APP_DIRS para declarar los loaders: las plantillas se compilan
+        # una vez por proceso y no en cada render
+        'APP_DIRS': False,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'web.context_processors.cart',
+                'web.context_processors.static_version',
             ],
         },
     },
@@ -83,8 +96,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Réplica de lectura local para probar web/routers.py: el mismo archivo y,
+    # en los tests, un espejo de default. Se activa con DATABASE_REPLICAS.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
+DATABASE_ROUTERS = ['web.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
 
 
 # Password validation
@@ -124,6 +146,10 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Miniaturas de las imágenes de los flanes (ver web/images.py)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # URL settings
 APPEND_SLASH = False
 
@@ -141,3 +167,14 @@ CSRF_COOKIE_SECURE = False
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Fracción de peticiones instrumentadas (Server-Timing + log de rendimiento)
+PERFORMANCE_SAMPLE_RATE = 1.0
+
+# runserver atiende con un solo proceso: su LocMemCache cuenta como compartida
+# para las invalidaciones entre procesos (ver web/caching.py)
+SHARED_CACHE = True
+
+# Correos de desarrollo a la consola; los envía el worker de run_jobs
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+CONTACT_NOTIFY_EMAILS = ['contacto@onlyflans.com']
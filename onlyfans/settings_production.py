@@ -34,12 +34,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'web.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'web.middleware.ReplicaStickinessMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'web.middleware.CachedAuthenticationMiddleware',
+    'web.middleware.GuestCartMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -48,15 +51,25 @@ ROOT_URLCONF = 'onlyfans.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'web.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
+        # Sin APP_DIRS para declarar los loaders: las plantillas se compilan
+        # una vez por proceso y no en cada render
+        'APP_DIRS': False,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'web.context_processors.cart',
+                'web.context_processors.static_version',
             ],
         },
     },
@@ -79,6 +92,17 @@ DATABASES = {
     }
 }
 
+# Réplicas de lectura para el catálogo y las reseñas (ver web/routers.py):
+# DB_REPLICA_HOSTS=replica1,replica2 con las mismas credenciales que default
+DATABASES.update({
+    f'replica{index}': dict(DATABASES['default'], HOST=host.strip())
+    for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1)
+})
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+DATABASE_ROUTERS = ['web.routers.ReplicaRouter']
+# Tiempo que un cliente lee del primario después de escribir
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -113,7 +137,8 @@ STATICFILES_DIRS = [
 ]
 
 # WhiteNoise for static files
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise más el paquete de CSS y el CSS crítico (ver web/assets.py)
+STATICFILES_STORAGE = 'web.storage.BundledStaticFilesStorage'
 
 # Media files
 MEDIA_URL = '/media/'
@@ -142,6 +167,8 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@onlyflans.com')
+# Avisos de nuevos mensajes de contacto (separados por comas), enviados por run_jobs
+CONTACT_NOTIFY_EMAILS = [e for e in os.environ.get('CONTACT_NOTIFY_EMAILS', '').split(',') if e]
 
 # Logging
 LOGGING = {
@@ -156,6 +183,10 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'message': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'file': {
@@ -169,6 +200,11 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        'performance': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
     },
     'root': {
         'handlers': ['console', 'file'],
@@ -180,24 +216,42 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # Una línea JSON por petición muestreada (web.middleware.PerformanceMiddleware)
+        'web.performance': {
+            'handlers': ['performance'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
+# Fracción de peticiones instrumentadas (Server-Timing + log de rendimiento)
+PERFORMANCE_SAMPLE_RATE = float(os.environ.get('PERFORMANCE_SAMPLE_RATE', 0.1))
+
 # Performance settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Con varios workers la cache tiene que ser compartida (Redis): las
+# invalidaciones por versión (catálogo, páginas, usuarios) se hacen en la cache,
+# y con LocMemCache sólo las ve el proceso que las hizo. Sin REDIS_URL la
+# cache es local: CachedAuthenticationMiddleware lee el usuario de la base
+# de datos en cada petición y las miniaturas que genera run_jobs aparecen
+# cuando expiran las entradas del catálogo (ver caching.cache_is_shared()).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
 
-# If using Redis (recommended for production)
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-#         'LOCATION': 'redis://127.0.0.1:6379/1',
-#     }
-# }
+# Catálogo de flanes cacheado con claves versionadas (ver web/caching.py)
+CATALOG_CACHE_TIMEOUT = 60 * 15
 
 # Compression
 # INSTALLED_APPS.append('django.middleware.gzip.GZipMiddleware')
@@ -18,5 +18,11 @@ urlpatterns = [
     path('add_to_cart/<int:flan_id>/', views.add_to_cart, name='add_to_cart'),
     path('remove_from_cart/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('flan/<int:flan_id>/', views.detalle_flan, name='detalle_flan'),
+    path('flan/<int:flan_id>/resenas/', views.detalle_flan_reviews, name='detalle_flan_reviews'),
     path('reviews/', views.reviews, name='reviews'),
+    path('buscar/', views.buscar, name='buscar'),
+    path('api/buscar/', views.buscar_api, name='buscar_api'),
+    path('api/autocompletar/', views.autocompletar, name='autocompletar'),
+    path('media/thumbs/<path:path>', views.thumbnail, name='thumbnail'),
+    path('sw.js', views.service_worker, name='service_worker'),
 ]
@@ -0,0 +1,265 @@
+import functools
+import json
+import os
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.template import Engine, TemplateDoesNotExist
+
+# Hojas de estilo del sitio empaquetadas en una sola. Al correr collectstatic,
+# CSSBundleMixin (ver web/storage.py) concatena y minifica CSS_FILES en
+# BUNDLE_NAME y calcula el CSS crítico de cada plantilla que extiende
+# base.html: las reglas cuyos selectores usan sólo clases, ids y etiquetas que
+# aparecen en la plantilla y las que extiende o incluye. Después el storage del
+# manifiesto le pone el hash a ambos archivos como a cualquier otro.
+#
+# {% stylesheets %} pone el CSS crítico en línea y carga el paquete sin
+# bloquear el render. Sin paquete (DEBUG, o sin collectstatic) enlaza las
+# hojas una por una.
+
+CSS_FILES = (
+    'web/css/base.css',
+    'web/css/theme.css',
+    'web/css/components.css',
+    'web/css/layout.css',
+    'web/css/navbar.css',
+    'web/css/hero.css',
+    'web/css/forms.css',
+    'web/css/modals.css',
+    'web/css/gallery.css',
+    'web/css/accessibility.css',
+    'web/css/site.css',
+)
+BUNDLE_NAME = 'web/css/bundle.css'
+CRITICAL_NAME = 'web/css/critical.json'
+BASE_TEMPLATE = 'base.html'
+# Lo que cabe en la primera ida y vuelta de TCP junto con el resto del <head>
+CRITICAL_MAX_BYTES = 14 * 1024
+
+_TOKEN_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)|([^"'/\s]+|/)''', re.S)
+# Sin espacio después de estos caracteres ni antes de los de _NO_SPACE_BEFORE.
+# "(" sí lo necesita antes: "screen and (max-width: ...)".
+_NO_SPACE_AFTER = set('{};,>:(')
+_NO_SPACE_BEFORE = set('{};,>)!')
+
+
+def minify_css(css):
+    """Quita comentarios y espacios innecesarios sin tocar las cadenas."""
+    out = []
+    space = False
+    for string, comment, whitespace, other in _TOKEN_RE.findall(css):
+        if comment:
+            continue
+        if whitespace:
+            space = True
+            continue
+        token = string or other
+        if not string:
+            token = token.replace(';}', '}')
+        if out:
+            previous = out[-1]
+            if token[0] == '}' and previous[-1] == ';' and previous[0] not in '"\'':
+                out[-1] = previous = previous[:-1]
+            if space and previous and previous[-1] not in _NO_SPACE_AFTER and token[0] not in _NO_SPACE_BEFORE:
+                out.append(' ')
+        out.append(token)
+        space = False
+    return ''.join(out).strip()
+
+
+def build_bundle(read):
+    """CSS de CSS_FILES minificado en un solo texto; ``read(nombre)`` da cada archivo.
+
+    Los @import se suben al principio, donde CSS exige que estén.
+    """
+    imports = []
+    rules = []
+    for name in CSS_FILES:
+        for prelude, body in _statements(minify_css(read(name))):
+            if body is None:
+                if prelude.startswith('@import') and prelude not in imports:
+                    imports.append(prelude)
+            else:
+                rules.append(f'{prelude}{{{body}}}')
+    return ''.join(f'{statement};' for statement in imports) + ''.join(rules)
+
+
+def _statements(css):
+    """Sentencias de primer nivel: ``(preludio, cuerpo)``; cuerpo None en @import."""
+    statements = []
+    depth = 0
+    start = 0
+    body_start = None
+    quote = None
+    for index, char in enumerate(css):
+        if quote:
+            if char == quote and css[index - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                body_start = index
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                statements.append((css[start:body_start].strip(), css[body_start + 1:index]))
+                start = index + 1
+        elif char == ';' and depth == 0:
+            statements.append((css[start:index].strip(), None))
+            start = index + 1
+    return statements
+
+
+_PSEUDO_RE = re.compile(r'::?[\w-]+(\([^)]*\))?|\[[^\]]*\]')
+_COMBINATOR_RE = re.compile(r'\s*[\s>+~]\s*')
+_TAG_RE = re.compile(r'^[a-zA-Z][\w-]*')
+_ALWAYS_PRESENT = {'html', 'body', '*'}
+
+
+def _selector_matches(selector, tokens):
+    for compound in _COMBINATOR_RE.split(_PSEUDO_RE.sub('', selector).strip()):
+        if not compound:
+            continue
+        tag = _TAG_RE.match(compound)
+        if tag and tag.group().lower() not in tokens['tags'] | _ALWAYS_PRESENT:
+            return False
+        if not set(re.findall(r'\.([\w-]+)', compound)) <= tokens['classes']:
+            return False
+        if not set(re.findall(r'#([\w-]+)', compound)) <= tokens['ids']:
+            return False
+    return True
+
+
+def _rule_matches(prelude, tokens):
+    return any(_selector_matches(selector, tokens) for selector in prelude.split(','))
+
+
+def _relative_url(body):
+    # En línea, una url() relativa se resolvería contra la página y no la hoja
+    return any(
+        not url.strip('\'"').startswith(('data:', 'http:', 'https:', '/', '#'))
+        for url in re.findall(r'url\(([^)]*)\)', body)
+    )
+
+
+def extract_critical(css, tokens, max_bytes=CRITICAL_MAX_BYTES):
+    """Reglas de ``css`` que aplican a ``tokens``, en orden y hasta ``max_bytes``."""
+    keyframes = {}
+    selected = []
+    size = 0
+    for prelude, body in _statements(css):
+        if body is None:
+            continue
+        if prelude.startswith(('@keyframes', '@-webkit-keyframes')):
+            keyframes[prelude.split()[-1]] = f'{prelude}{{{body}}}'
+            continue
+        if prelude.startswith('@media'):
+            if 'print' in prelude:
+                continue
+            inner = ''.join(
+                f'{p}{{{b}}}' for p, b in _statements(body)
+                if b is not None and _rule_matches(p, tokens) and not _relative_url(b)
+            )
+            rule = f'{prelude}{{{inner}}}' if inner else None
+        elif prelude.startswith('@'):
+            rule = None
+        else:
+            rule = f'{prelude}{{{body}}}' if _rule_matches(prelude, tokens) and not _relative_url(body) else None
+        if rule is None:
+            continue
+        if size + len(rule) > max_bytes:
+            break
+        selected.append(rule)
+        size += len(rule)
+    critical = ''.join(selected)
+    for name, rule in keyframes.items():
+        if re.search(rf'(?<![\w-]){re.escape(name)}(?![\w-])', critical) and size + len(rule) <= max_bytes:
+            critical += rule
+            size += len(rule)
+    return critical
+
+
+_INHERIT_RE = re.compile(r'{%\s*(?:extends|include)\s+["\']([^"\']+)["\']')
+_TEMPLATE_TAG_RE = re.compile(r'{[{%#].*?[}%#]}', re.S)
+
+
+def _template_source(name):
+    # Sólo el texto: no hace falta compilar la plantilla
+    for loader in Engine.get_default().template_loaders:
+        for origin in loader.get_template_sources(name):
+            try:
+                return loader.get_contents(origin)
+            except TemplateDoesNotExist:
+                continue
+    raise TemplateDoesNotExist(name)
+
+
+def template_tokens(name):
+    """Clases, ids y etiquetas de la plantilla y las que extiende o incluye."""
+    tokens = {'classes': set(), 'ids': set(), 'tags': set()}
+    pending, seen = [name], set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        source = _template_source(current)
+        pending.extend(_INHERIT_RE.findall(source))
+        for attribute, key in (('class', 'classes'), ('id', 'ids')):
+            for value in re.findall(rf'\b{attribute}\s*=\s*"([^"]*)"', source):
+                tokens[key].update(_TEMPLATE_TAG_RE.sub(' ', value).split())
+        tokens['tags'].update(tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', source))
+    return tokens
+
+
+def page_templates():
+    """Plantillas de la app que extienden base.html."""
+    directory = os.path.join(apps.get_app_config('web').path, 'templates')
+    names = []
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if not filename.endswith('.html'):
+                continue
+            name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+            if re.search(rf'{{%\s*extends\s+["\']{re.escape(BASE_TEMPLATE)}["\']', _template_source(name)):
+                names.append(name)
+    return sorted(names)
+
+
+def build_critical(css):
+    return {name: extract_critical(css, template_tokens(name)) for name in page_templates()}
+
+
+@functools.lru_cache(maxsize=None)
+def load_critical():
+    """CSS crítico por plantilla, o None si no hay paquete que usar."""
+    # runserver sirve los estáticos desde las apps, no desde STATIC_ROOT
+    if settings.DEBUG or not staticfiles_storage.exists(CRITICAL_NAME):
+        return None
+    with staticfiles_storage.open(CRITICAL_NAME) as file:
+        return json.load(file)
+
+
+class CSSBundleMixin:
+    """Para storages de archivos estáticos: genera el paquete y el CSS crítico
+    en post_process, antes de que el manifiesto calcule los hashes."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            def read(name):
+                with self.open(name) as file:
+                    return file.read().decode()
+
+            bundle = build_bundle(read)
+            critical = build_critical(bundle)
+            for name, content in ((BUNDLE_NAME, bundle), (CRITICAL_NAME, json.dumps(critical))):
+                if self.exists(name):
+                    self.delete(name)
+                self.save(name, ContentFile(content.encode()))
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
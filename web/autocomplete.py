@@ -0,0 +1,145 @@
+import bisect
+import threading
+import unicodedata
+
+from .caching import bump_version, get_version
+from .routers import use_primary
+
+# Sugerencias de nombres de flan mientras se escribe. Cada proceso mantiene en
+# memoria listas ordenadas de claves (el nombre normalizado desde cada una de
+# sus palabras), una para los flanes públicos y otra para los privados, y busca
+# por prefijo con bisect, sin consultar la base de datos.
+#
+# El índice se construye la primera vez que se usa. Las señales de Flan lo
+# actualizan sólo en el proceso que hace el cambio y suben la versión compartida
+# AUTOCOMPLETE_NAMESPACE; los demás procesos ven otra versión y en la siguiente
+# consulta reconstruyen el índice entero desde la base de datos.
+
+AUTOCOMPLETE_NAMESPACE = 'autocomplete'
+DEFAULT_LIMIT = 8
+# Entradas revisadas por lista y consulta: acota el trabajo con prefijos muy
+# comunes. Los privados van aparte para no ocupar la ventana de los públicos.
+MAX_SCANNED = 200
+
+
+def normalize(text):
+    """Minúsculas y sin acentos: "Clásico" y "clasico" son la misma clave."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _keys(name):
+    words = normalize(name).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self, flans=()):
+        self._lock = threading.Lock()
+        # is_private -> [(clave, posición de la palabra, pk)], ordenadas
+        self._entries = {False: [], True: []}
+        self._flans = {}    # pk -> (nombre, is_private)
+        self.version = None
+        for pk, name, is_private in flans:
+            self._flans[pk] = (name, is_private)
+            self._entries[is_private].extend((key, position, pk) for position, key in enumerate(_keys(name)))
+        for entries in self._entries.values():
+            entries.sort()
+
+    def __len__(self):
+        return len(self._flans)
+
+    def add(self, pk, name, is_private):
+        with self._lock:
+            self._remove(pk)
+            self._flans[pk] = (name, is_private)
+            for position, key in enumerate(_keys(name)):
+                bisect.insort(self._entries[is_private], (key, position, pk))
+
+    def remove(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        previous = self._flans.pop(pk, None)
+        if previous is None:
+            return
+        name, is_private = previous
+        entries = self._entries[is_private]
+        for position, key in enumerate(_keys(name)):
+            index = bisect.bisect_left(entries, (key, position, pk))
+            if index < len(entries) and entries[index] == (key, position, pk):
+                del entries[index]
+
+    def suggest(self, prefix, include_private=False, limit=DEFAULT_LIMIT):
+        """Hasta ``limit`` flanes ``(pk, nombre)`` cuyo nombre tiene una palabra
+        que empieza por ``prefix``; primero los que empiezan así."""
+        prefix = ' '.join(normalize(prefix).split())
+        if not prefix:
+            return []
+        found = {}
+        with self._lock:
+            for is_private in (False, True) if include_private else (False,):
+                entries = self._entries[is_private]
+                index = bisect.bisect_left(entries, (prefix,))
+                for key, position, pk in entries[index:index + MAX_SCANNED]:
+                    if not key.startswith(prefix):
+                        break
+                    found[pk] = min(position, found.get(pk, position))
+        ranked = sorted(found, key=lambda pk: (found[pk], len(self._flans[pk][0]), self._flans[pk][0], pk))
+        return [(pk, self._flans[pk][0]) for pk in ranked[:limit]]
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _load():
+    from .models import Flan
+    # El índice vive lo que el proceso: no construirlo desde una réplica atrasada
+    with use_primary():
+        return PrefixIndex(Flan.objects.values_list('pk', 'name', 'is_private').iterator())
+
+
+def get_index():
+    """Índice del proceso, (re)construido si otro proceso cambió los flanes."""
+    global _index
+    version = get_version(AUTOCOMPLETE_NAMESPACE)
+    if _index is None or _index.version != version:
+        with _build_lock:
+            if _index is None or _index.version != version:
+                index = _load()
+                index.version = version
+                _index = index
+    return _index
+
+
+def _bump(index):
+    previous = index.version if index is not None else None
+    version = bump_version(AUTOCOMPLETE_NAMESPACE)
+    # Si nadie más cambió nada entretanto, el índice local ya está al día
+    if index is not None and previous is not None and version == previous + 1:
+        index.version = version
+
+
+def flan_changed(pk, name, is_private):
+    index = _index
+    if index is not None:
+        index.add(pk, name, is_private)
+    _bump(index)
+
+
+def flan_removed(pk):
+    index = _index
+    if index is not None:
+        index.remove(pk)
+    _bump(index)
+
+
+def invalidate():
+    """Tras cambios masivos sin señales (bulk_create): todos reconstruyen."""
+    bump_version(AUTOCOMPLETE_NAMESPACE)
+
+
+def suggest(prefix, include_private=False, limit=DEFAULT_LIMIT):
+    return get_index().suggest(prefix, include_private, limit)
@@ -0,0 +1,239 @@
+import io
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from PIL import Image
+
+from . import images
+from .models import CartItem, Flan, Review
+from .ratings import rebuild_rating_aggregates
+
+# Banco de pruebas de consultas y latencia por vista. Recorre todas las rutas
+# de onlyfans.urls con el cliente de pruebas sobre un conjunto de datos
+# realista (ver web/seeding.py) y compara los resultados con un presupuesto por ruta.
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Presupuesto por ruta: consultas con la cache vacía, p95 en milisegundos y
+# pico de memoria asignada en KiB. Una ruta sin entrada usa DEFAULT_BUDGET.
+DEFAULT_BUDGET = {'queries': 10, 'p95_ms': 250, 'memory_kib': 4096}
+BUDGETS = {
+    # index muestra todo el catálogo público: su memoria crece con el catálogo
+    'index': {'queries': 2, 'memory_kib': 16384},
+    'about': {'queries': 0},
+    'flans_list': {'queries': 2},
+    'detalle_flan': {'queries': 3},
+    'detalle_flan_reviews': {'queries': 2},
+    'welcome': {'queries': 4},
+    'carrito': {'queries': 5},
+    'reviews': {'queries': 4},
+    'add_to_cart': {'queries': 3},
+    'remove_from_cart': {'queries': 6},
+    'contacto': {'queries': 0},
+    'exito_contacto': {'queries': 0},
+    'register': {'queries': 0},
+    'buscar': {'queries': 2, 'p95_ms': 20},
+    'buscar_api': {'queries': 2, 'p95_ms': 20},
+    # Construir el índice la primera vez sí consulta la base de datos
+    'autocompletar': {'queries': 1, 'p95_ms': 10},
+    'thumbnail': {'queries': 0},
+    'service_worker': {'queries': 0},
+}
+
+
+class Scenario:
+    """Cómo ejercitar una ruta: método, argumentos y si requiere sesión."""
+
+    def __init__(self, url_name, method='get', args=None, data=None, user=None, setup=None, relogin=False):
+        self.url_name = url_name
+        self.method = method
+        self.args = args
+        self.data = data
+        self.user = user  # None, 'customer' o 'staff'
+        self.setup = setup
+        self.relogin = relogin  # la petición cierra la sesión (logout)
+
+    def url(self, dataset):
+        args = self.args(dataset) if self.args else ()
+        return reverse(self.url_name, args=args)
+
+
+def _add_cart_item(dataset):
+    item, _ = CartItem.objects.get_or_create(user=dataset['customer'], flan=dataset['public_flan'])
+    return {'cart_item': item}
+
+
+def _placeholder_image(url):
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 800), (210, 140, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _build_thumbnail(dataset):
+    # Imagen generada localmente: el benchmark no descarga nada
+    manifest, _ = images.build_thumbnails('benchmark://placeholder', _placeholder_image)
+    return {'thumbnail': manifest['webp'][0][1].removeprefix(f'{images.THUMBNAIL_DIR}/')}
+
+
+# Claves: nombre de la ruta, o el prefijo de los include() sin nombre
+SCENARIOS = {
+    'admin/': Scenario('admin:index', user='staff'),
+    'index': Scenario('index'),
+    'about': Scenario('about'),
+    'welcome': Scenario('welcome', user='customer'),
+    'flans_list': Scenario('flans_list'),
+    'contacto': Scenario('contacto'),
+    'exito_contacto': Scenario('exito_contacto'),
+    'accounts/': Scenario('login'),
+    'register': Scenario('register'),
+    'carrito': Scenario('carrito', user='customer'),
+    'logout': Scenario('logout', method='post', user='customer', relogin=True),
+    'add_to_cart': Scenario(
+        'add_to_cart', method='post', user='customer',
+        args=lambda dataset: [dataset['public_flan'].pk],
+    ),
+    'remove_from_cart': Scenario(
+        'remove_from_cart', method='post', user='customer',
+        setup=_add_cart_item, args=lambda dataset: [dataset['cart_item'].pk],
+    ),
+    'detalle_flan': Scenario('detalle_flan', args=lambda dataset: [dataset['popular_flan'].pk]),
+    'detalle_flan_reviews': Scenario(
+        'detalle_flan_reviews', args=lambda dataset: [dataset['popular_flan'].pk],
+    ),
+    'reviews': Scenario('reviews', user='customer'),
+    'buscar': Scenario('buscar', data={'q': 'flan coco'}),
+    'buscar_api': Scenario('buscar_api', data={'q': 'flan coco'}),
+    'autocompletar': Scenario('autocompletar', data={'q': 'fla'}),
+    'thumbnail': Scenario('thumbnail', setup=_build_thumbnail, args=lambda dataset: [dataset['thumbnail']]),
+    'service_worker': Scenario('service_worker'),
+}
+
+
+def route_keys(urlpatterns):
+    """Identificador de cada entrada de urlpatterns (nombre o prefijo)."""
+    keys = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name:
+            keys.append(pattern.name)
+        elif isinstance(pattern, URLResolver):
+            keys.append(str(pattern.pattern))
+    return keys
+
+
+def build_fixtures():
+    """Usuarios y objetos con nombre que necesitan los escenarios."""
+    customer = User.objects.create_user('bench-customer', password=BENCHMARK_PASSWORD)
+    staff = User.objects.create_superuser('bench-staff', password=BENCHMARK_PASSWORD)
+    popular_flan = Flan.objects.filter(is_private=False).order_by('-review_count').first()
+    for flan_id in Flan.objects.filter(is_private=False).values_list('pk', flat=True)[:5]:
+        CartItem.objects.get_or_create(user=customer, flan_id=flan_id)
+    Review.objects.bulk_create(
+        [Review(flan=popular_flan, user=customer, rating=5, comment='Mi reseña') for _ in range(20)]
+    )
+    # bulk_create no dispara las señales que mantienen los agregados
+    rebuild_rating_aggregates(Flan.objects.filter(pk=popular_flan.pk))
+    popular_flan.refresh_from_db()
+    return {
+        'customer': customer,
+        'staff': staff,
+        'popular_flan': popular_flan,
+        'public_flan': Flan.objects.filter(is_private=False).order_by('pk').first(),
+    }
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _prepare(client, scenario, dataset):
+    # Fuera de la medición: sesión y datos que la petición consume
+    if scenario.relogin:
+        client.force_login(dataset[scenario.user])
+    if scenario.setup:
+        dataset.update(scenario.setup(dataset))
+    return scenario.url(dataset)
+
+
+def _request(client, scenario, url):
+    if scenario.method == 'post':
+        return client.post(url, scenario.data or {}, secure=True)
+    return client.get(url, scenario.data or {}, secure=True)
+
+
+def run_scenario(key, scenario, dataset, iterations=20):
+    client = Client()
+    if scenario.user:
+        client.force_login(dataset[scenario.user])
+
+    # Consultas con la cache vacía: es lo que detecta un N+1 aunque luego la
+    # cache lo oculte en las peticiones siguientes.
+    url = _prepare(client, scenario, dataset)
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = _request(client, scenario, url)
+    cold_queries = len(queries)
+
+    timings = []
+    warm_queries = 0
+    for _ in range(iterations):
+        url = _prepare(client, scenario, dataset)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            _request(client, scenario, url)
+            timings.append((time.perf_counter() - start) * 1000)
+        warm_queries += len(queries)
+
+    url = _prepare(client, scenario, dataset)
+    tracemalloc.start()
+    try:
+        _request(client, scenario, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'route': key,
+        'url_name': scenario.url_name,
+        'status': response.status_code,
+        'queries': cold_queries,
+        'queries_warm': round(warm_queries / iterations, 2),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'memory_kib': round(peak / 1024, 1),
+    }
+
+
+def check_budgets(results, budgets=None, default=None):
+    """Lista de mensajes con cada métrica que excede su presupuesto."""
+    budgets = BUDGETS if budgets is None else budgets
+    default = DEFAULT_BUDGET if default is None else default
+    violations = []
+    for result in results:
+        if result['status'] >= 400:
+            violations.append(f"{result['route']}: status={result['status']}")
+        budget = dict(default, **budgets.get(result['route'], {}))
+        for metric, limit in budget.items():
+            if result[metric] > limit:
+                violations.append(f"{result['route']}: {metric}={result[metric]} > {limit}")
+    return violations
+
+
+def run_benchmarks(urlpatterns, dataset, iterations=20, routes=None):
+    missing = [key for key in route_keys(urlpatterns) if key not in SCENARIOS]
+    if missing:
+        raise ValueError(f"Rutas sin escenario de benchmark: {', '.join(missing)}")
+    results = []
+    for key in route_keys(urlpatterns):
+        if routes and key not in routes:
+            continue
+        results.append(run_scenario(key, SCENARIOS[key], dataset, iterations))
+    return results
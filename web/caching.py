@@ -0,0 +1,183 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .instrumentation import record_cache
+from .routers import use_primary
+
+# Los datos cacheados nunca se borran explícitamente: cada espacio de nombres
+# tiene un número de versión que forma parte de la clave, y al invalidarlo se
+# incrementa la versión. Las entradas antiguas quedan huérfanas y expiran solas.
+#
+# La versión vive en la propia cache: con un backend compartido (Redis) todos
+# los procesos ven el cambio, pero con LocMemCache sólo el proceso que invalidó;
+# los demás sirven sus entradas hasta que expiran. Ver cache_is_shared().
+
+CATALOG_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 15)
+
+# Backends cuyo contenido es de cada proceso: invalidar en uno no invalida en
+# los demás.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """Si todos los procesos ven la misma cache ``default``.
+
+    SHARED_CACHE lo fija explícitamente (p. ej. un único proceso con LocMem).
+    """
+    shared = getattr(settings, 'SHARED_CACHE', None)
+    if shared is not None:
+        return shared
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+# Lo que se cachea se lee del primario: tras una invalidación, una réplica
+# atrasada guardaría datos viejos bajo la versión nueva hasta que expiren.
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def _initial_version():
+    # Si la versión fue expulsada de la cache pero sus datos no, empezar desde
+    # la hora actual evita reutilizar una versión antigua y servir datos viejos.
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # add() no pisa la versión si otro proceso se adelantó
+        cache.add(_version_key(namespace), _initial_version(), None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def get_versions(namespaces):
+    """Versiones de varios espacios de nombres con una sola lectura de cache."""
+    found = cache.get_many([_version_key(namespace) for namespace in namespaces])
+    return [
+        found.get(_version_key(namespace)) or get_version(namespace)
+        for namespace in namespaces
+    ]
+
+
+async def aget_version(namespace):
+    version = await cache.aget(_version_key(namespace))
+    if version is None:
+        await cache.aadd(_version_key(namespace), _initial_version(), None)
+        version = await cache.aget(_version_key(namespace))
+    return version
+
+
+async def aget_versions(namespaces):
+    found = await cache.aget_many([_version_key(namespace) for namespace in namespaces])
+    return [
+        found.get(_version_key(namespace)) or await aget_version(namespace)
+        for namespace in namespaces
+    ]
+
+
+def bump_version(namespace):
+    try:
+        return cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.add(_version_key(namespace), _initial_version(), None)
+        return cache.incr(_version_key(namespace))
+
+
+def versioned_key(namespace, *parts):
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{namespace}:v{get_version(namespace)}:{suffix}'
+
+
+async def aversioned_key(namespace, *parts):
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{namespace}:v{await aget_version(namespace)}:{suffix}'
+
+
+def catalog_namespace(is_private):
+    return 'catalog:private' if is_private else 'catalog:public'
+
+
+def get_catalog(is_private=False):
+    """Lista de flanes públicos o privados ordenados por nombre, cacheada."""
+    key = versioned_key(catalog_namespace(is_private), 'all')
+    flans = cache.get(key)
+    record_cache(flans is not None)
+    if flans is None:
+        from .models import Flan
+        with use_primary():
+            flans = list(Flan.objects.filter(is_private=is_private).order_by('name'))
+        cache.set(key, flans, CATALOG_TIMEOUT)
+    return flans
+
+
+async def aget_catalog(is_private=False):
+    """Versión async de get_catalog: misma clave, cache y ORM async."""
+    key = await aversioned_key(catalog_namespace(is_private), 'all')
+    flans = await cache.aget(key)
+    record_cache(flans is not None)
+    if flans is None:
+        from .models import Flan
+        queryset = Flan.objects.filter(is_private=is_private).order_by('name')
+        with use_primary():
+            flans = [flan async for flan in queryset.aiterator()]
+        await cache.aset(key, flans, CATALOG_TIMEOUT)
+    return flans
+
+
+def _catalog_page_paginator(per_page):
+    from .models import Flan
+    from .pagination import CursorPaginator
+
+    return CursorPaginator(
+        Flan.objects.filter(is_private=False),
+        ordering=('name', 'id'),
+        per_page=per_page,
+        count_mode='estimate',
+    )
+
+
+def _catalog_page_parts(cursor, per_page):
+    token = hashlib.md5((cursor or '').encode(), usedforsecurity=False).hexdigest()
+    return catalog_namespace(False), 'page', per_page, token
+
+
+async def aget_catalog_page(cursor=None, per_page=10):
+    """Página del catálogo público paginada por cursor, cacheada por cursor."""
+    key = await aversioned_key(*_catalog_page_parts(cursor, per_page))
+    page = await cache.aget(key)
+    record_cache(page is not None)
+    if page is None:
+        with use_primary():
+            page = await _catalog_page_paginator(per_page).aget_page(cursor)
+        await cache.aset(key, page, CATALOG_TIMEOUT)
+    return page
+
+
+def invalidate_catalog(*scopes):
+    """Invalida el catálogo público, el privado o ambos (sin argumentos)."""
+    if not scopes:
+        scopes = (False, True)
+    for is_private in set(scopes):
+        bump_version(catalog_namespace(is_private))
+
+
+def invalidate_everything():
+    """Invalida todo lo que depende del catálogo, tras cambios masivos sin
+    señales (bulk_create, update): catálogos, páginas, autocompletado y los
+    totales de los carritos (los precios pudieron cambiar)."""
+    from . import autocomplete
+    from .cart import CART_SUMMARY_NAMESPACE
+    from .page_cache import purge_tags
+
+    invalidate_catalog()
+    autocomplete.invalidate()
+    purge_tags('catalog')
+    bump_version(CART_SUMMARY_NAMESPACE)
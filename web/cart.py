@@ -0,0 +1,204 @@
+import json
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DecimalField, F, Sum
+
+from .caching import versioned_key
+from .instrumentation import record_cache
+from .models import CartItem, Flan
+
+CART_SUMMARY_NAMESPACE = 'cart:summary'
+CART_SUMMARY_TIMEOUT = getattr(settings, 'CART_SUMMARY_CACHE_TIMEOUT', 60 * 60)
+
+
+def _normalize_items(items):
+    """Acepta ``{flan_id: cantidad}`` o pares ``(flan_id, cantidad)``."""
+    if hasattr(items, 'items'):
+        items = items.items()
+    quantities = Counter()
+    for flan_id, quantity in items:
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError('La cantidad debe ser mayor que cero')
+        quantities[int(flan_id)] += quantity
+    return quantities
+
+
+def _upsert_sql(quantities):
+    qn = connection.ops.quote_name
+    cart_table = qn(CartItem._meta.db_table)
+    flan_table = qn(Flan._meta.db_table)
+    user_col = qn(CartItem._meta.get_field('user').column)
+    flan_col = qn(CartItem._meta.get_field('flan').column)
+    quantity_col = qn(CartItem._meta.get_field('quantity').column)
+    flan_pk = qn(Flan._meta.pk.column)
+
+    cases = ' '.join(['WHEN %s THEN CAST(%s AS integer)'] * len(quantities))
+    placeholders = ', '.join(['%s'] * len(quantities))
+    # INSERT ... SELECT sólo inserta flanes que existen, y ON CONFLICT suma la
+    # cantidad en la misma sentencia: sin lecturas previas ni condiciones de
+    # carrera. (SQLite exige el WHERE para desambiguar ON CONFLICT.)
+    sql = (
+        f'INSERT INTO {cart_table} ({user_col}, {flan_col}, {quantity_col}) '
+        f'SELECT %s, f.{flan_pk}, CASE f.{flan_pk} {cases} END '
+        f'FROM {flan_table} f WHERE f.{flan_pk} IN ({placeholders}) '
+        f'ON CONFLICT ({user_col}, {flan_col}) '
+        f'DO UPDATE SET {quantity_col} = {cart_table}.{quantity_col} + excluded.{quantity_col}'
+    )
+    return sql
+
+
+def add_items(user, items):
+    """Suma cantidades al carrito de ``user`` en una sola sentencia.
+
+    Devuelve cuántos flanes distintos se añadieron o incrementaron; los ids
+    de flanes inexistentes se ignoran.
+    """
+    quantities = _normalize_items(items)
+    if not quantities:
+        return 0
+
+    if connection.vendor in ('sqlite', 'postgresql'):
+        params = [user.pk]
+        for flan_id, quantity in quantities.items():
+            params.extend([flan_id, quantity])
+        params.extend(quantities.keys())
+        with connection.cursor() as cursor:
+            cursor.execute(_upsert_sql(quantities), params)
+            added = cursor.rowcount
+        # SQL directo: no hay señales de CartItem que invaliden el resumen
+        invalidate_cart_summary(user.pk)
+        return added
+
+    # Otros motores: UPDATE atómico con F() y, si no hay fila, INSERT
+    added = 0
+    existing = set(Flan.objects.filter(pk__in=quantities).values_list('pk', flat=True))
+    for flan_id, quantity in quantities.items():
+        if flan_id not in existing:
+            continue
+        updated = CartItem.objects.filter(user=user, flan_id=flan_id).update(quantity=F('quantity') + quantity)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(user=user, flan_id=flan_id, quantity=quantity)
+            except IntegrityError:
+                CartItem.objects.filter(user=user, flan_id=flan_id).update(quantity=F('quantity') + quantity)
+        added += 1
+    # update() tampoco manda señales
+    invalidate_cart_summary(user.pk)
+    return added
+
+
+def add_to_cart(user, flan_id, quantity=1):
+    """Añade ``quantity`` unidades de un flan; False si el flan no existe."""
+    return add_items(user, {flan_id: quantity}) > 0
+
+
+def _summary_key(user_id):
+    # La versión del espacio de nombres cambia cuando cambia algún precio
+    return versioned_key(CART_SUMMARY_NAMESPACE, user_id)
+
+
+def cart_totals(user):
+    """Cantidad de unidades y total del carrito, agregados en SQL."""
+    totals = CartItem.objects.filter(user=user).aggregate(
+        count=Sum('quantity'),
+        total=Sum(F('quantity') * F('flan__price'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+    )
+    return {'count': totals['count'] or 0, 'total': totals['total'] or Decimal('0.00')}
+
+
+def get_cart_summary(user):
+    key = _summary_key(user.pk)
+    summary = cache.get(key)
+    record_cache(summary is not None)
+    if summary is None:
+        summary = cart_totals(user)
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_cart_summary(user_id):
+    cache.delete(_summary_key(user_id))
+
+
+# Carrito de invitados: vive en una cookie firmada, así que navegar y llenar el
+# carrito sin sesión no escribe nada en la base de datos. Al iniciar sesión se
+# fusiona con CartItem (ver web/signals.py).
+
+CART_COOKIE_NAME = getattr(settings, 'CART_COOKIE_NAME', 'cart')
+CART_COOKIE_SALT = 'web.cart'
+CART_COOKIE_MAX_AGE = 60 * 60 * 24 * 14
+MAX_GUEST_CART_ITEMS = 50
+
+
+class GuestCart:
+    def __init__(self, request):
+        self.items = {}
+        self.modified = False
+        try:
+            raw = request.get_signed_cookie(CART_COOKIE_NAME, salt=CART_COOKIE_SALT, max_age=CART_COOKIE_MAX_AGE)
+            self.items = dict(_normalize_items(json.loads(raw)))
+        except (KeyError, signing.BadSignature, ValueError, TypeError, AttributeError):
+            # Sin cookie, cookie manipulada o con formato inválido: carrito vacío
+            self.items = {}
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def count(self):
+        return sum(self.items.values())
+
+    def add(self, flan_id, quantity=1):
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError('La cantidad debe ser mayor que cero')
+        flan_id = int(flan_id)
+        if flan_id not in self.items and len(self.items) >= MAX_GUEST_CART_ITEMS:
+            return False
+        self.items[flan_id] = self.items.get(flan_id, 0) + quantity
+        self.modified = True
+        return True
+
+    def remove(self, flan_id):
+        if self.items.pop(int(flan_id), None) is not None:
+            self.modified = True
+
+    def clear(self):
+        if self.items:
+            self.items = {}
+            self.modified = True
+
+    def save(self, response):
+        if not self.modified:
+            return
+        if self.items:
+            response.set_signed_cookie(
+                CART_COOKIE_NAME,
+                json.dumps({str(flan_id): quantity for flan_id, quantity in self.items.items()}),
+                salt=CART_COOKIE_SALT,
+                max_age=CART_COOKIE_MAX_AGE,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        else:
+            response.delete_cookie(CART_COOKIE_NAME, samesite='Lax')
+
+
+def merge_guest_cart(user, guest_cart):
+    """Pasa el carrito de invitado a CartItem en una sola sentencia."""
+    if not guest_cart:
+        return 0
+    merged = add_items(user, guest_cart.items)
+    guest_cart.clear()
+    return merged
@@ -0,0 +1,181 @@
+import csv
+import json
+import time
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+
+from .caching import invalidate_everything
+from .models import Flan
+from .page_cache import purge_tags
+from .search import reindex
+
+# Importación y exportación del catálogo en CSV o JSONL. Ambas trabajan fila a
+# fila (o lote a lote) para que la memoria no dependa del tamaño del archivo.
+
+FIELDS = ('slug', 'name', 'description', 'price', 'is_private', 'image_url')
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 1000
+# BooleanField sólo acepta 't'/'f', '1'/'0' y 'True'/'False'
+_BOOLEANS = {'true': True, 'yes': True, 'sí': True, 'si': True, 'false': False, 'no': False}
+
+
+def detect_format(path):
+    for fmt in FORMATS:
+        if path.endswith(f'.{fmt}'):
+            return fmt
+    return None
+
+
+def read_rows(stream, fmt):
+    """Itera ``(número de línea, dict)`` sin cargar el archivo en memoria."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError:
+                yield line_num, None
+
+
+def clean_row(row):
+    """Valida y convierte una fila con los campos del modelo.
+
+    Sólo se devuelven las columnas presentes en la fila, para que una
+    importación parcial (p. ej. sólo precios) no pise el resto de campos.
+    """
+    if not isinstance(row, dict):
+        raise ValidationError('la fila no es un objeto JSON válido')
+    data = {}
+    errors = []
+    for name in FIELDS:
+        if row.get(name) in ('', None):
+            continue
+        field = Flan._meta.get_field(name)
+        value = row[name]
+        if field.get_internal_type() == 'BooleanField' and isinstance(value, str):
+            value = _BOOLEANS.get(value.strip().lower(), value)
+        try:
+            data[name] = field.clean(value, None)
+        except ValidationError as e:
+            errors.append(f"{name}: {' '.join(e.messages)}")
+    if 'slug' not in data and not errors:
+        errors.append('slug: es obligatorio')
+    if errors:
+        raise ValidationError(errors)
+    return data
+
+
+def _batches(rows, batch_size, report):
+    """Agrupa filas válidas en lotes; las inválidas se informan y se saltan."""
+    batch = {}
+    for line_num, row in rows:
+        try:
+            data = clean_row(row)
+        except ValidationError as e:
+            report.errors.append(f"línea {line_num}: {'; '.join(e.messages)}")
+            continue
+        # Un mismo slug dos veces en el lote: gana la última fila. Además
+        # PostgreSQL rechaza un ON CONFLICT que toque la misma fila dos veces.
+        batch.pop(data['slug'], None)
+        batch[data['slug']] = data
+        if len(batch) >= batch_size:
+            yield list(batch.values())
+            batch = {}
+    if batch:
+        yield list(batch.values())
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0
+
+
+def _upsert(batch):
+    # Un INSERT por conjunto de columnas: una fila no debe pisar con valores
+    # por defecto las columnas que no trae.
+    groups = {}
+    for data in batch:
+        groups.setdefault(frozenset(data), []).append(data)
+    for columns, group in groups.items():
+        Flan.objects.bulk_create(
+            [Flan(**data) for data in group],
+            update_conflicts=True,
+            unique_fields=['slug'],
+            # updated_at no viaja en el archivo pero debe cambiar: invalida las
+            # respuestas condicionales de las páginas del flan.
+            update_fields=sorted(columns - {'slug'}) + ['updated_at'],
+        )
+
+
+def import_flans(rows, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, progress=None):
+    """Inserta o actualiza flanes por ``slug`` en lotes de ``bulk_create``.
+
+    ``rows`` es el iterable de ``read_rows``. ``progress`` se llama con el
+    informe después de cada lote. Con ``dry_run`` sólo se valida y se cuenta.
+    """
+    report = ImportReport()
+    for batch in _batches(rows, batch_size, report):
+        slugs = [data['slug'] for data in batch]
+        existing = set(Flan.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        incomplete = [data['slug'] for data in batch if data['slug'] not in existing and 'name' not in data]
+        if incomplete:
+            report.errors.extend(f'slug {slug}: un flan nuevo necesita name' for slug in incomplete)
+            batch = [data for data in batch if data['slug'] not in incomplete]
+        if not dry_run and batch:
+            _upsert(batch)
+            # bulk_create no dispara señales: índice de búsqueda y páginas aquí
+            reindex(Flan.objects.filter(slug__in=[data['slug'] for data in batch]))
+            pks = Flan.objects.filter(slug__in=existing).values_list('pk', flat=True)
+            purge_tags(*[f'flan:{pk}' for pk in pks])
+        report.rows += len(batch)
+        report.updated += len(existing)
+        report.created += len(batch) - len(existing)
+        if progress:
+            progress(report)
+
+    if report.rows and not dry_run:
+        invalidate_everything()
+    return report
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def export_flans(stream, fmt, queryset=None, chunk_size=2000):
+    """Escribe el catálogo en ``stream`` recorriéndolo con ``.iterator()``."""
+    if queryset is None:
+        queryset = Flan.objects.all()
+    rows = queryset.order_by('pk').values_list(*FIELDS).iterator(chunk_size=chunk_size)
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(FIELDS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(dict(zip(FIELDS, map(_json_value, row))), ensure_ascii=False) + '\n')
+            count += 1
+    return count
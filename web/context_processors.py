@@ -0,0 +1,26 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import precache
+from .cart import get_cart_summary
+
+
+def cart(request):
+    """Resumen del carrito para el contador de la barra de navegación.
+
+    Es perezoso: sólo se calcula si la plantilla lo usa, y para usuarios
+    autenticados sale de la cache salvo tras un cambio en el carrito.
+    """
+    def summary():
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return get_cart_summary(user)
+        guest_cart = getattr(request, 'guest_cart', None)
+        return {'count': guest_cart.count if guest_cart else 0, 'total': None}
+
+    return {'cart_summary': SimpleLazyObject(summary)}
+
+
+def static_version(request):
+    """Versión de los estáticos desplegados, para las claves de los fragmentos
+    cacheados que llevan URLs de {% static %} con hash."""
+    return {'static_version': precache.get_manifest()['version']}
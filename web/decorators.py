@@ -0,0 +1,61 @@
+import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Equivalentes async de decoradores de Django 4.2 que sólo saben envolver
+# vistas síncronas (login_required, condition).
+
+
+async def auser(request):
+    """``request.user`` ya resuelto.
+
+    AuthenticationMiddleware lo deja como objeto perezoso que consulta la
+    sesión de forma síncrona; se resuelve una vez fuera del event loop y a
+    partir de ahí se puede usar directamente.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+def async_login_required(view_func):
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await auser(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """Como django.views.decorators.http.condition, con funciones async."""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag is not None else None
+            last_modified = None
+            if last_modified_func:
+                dt = await last_modified_func(request, *args, **kwargs)
+                if dt:
+                    if not timezone.is_aware(dt):
+                        dt = timezone.make_aware(dt, datetime.timezone.utc)
+                    last_modified = int(dt.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
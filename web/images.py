@@ -0,0 +1,154 @@
+import hashlib
+import io
+import json
+import urllib.request
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+# Miniaturas locales de Flan.image_url. La imagen original (remota y a tamaño
+# completo) se descarga una sola vez y se guarda en MEDIA_ROOT en varios anchos,
+# en WebP y JPEG, con el hash del contenido en el nombre: las URLs nunca cambian
+# de contenido y se sirven con cache de un año.
+#
+# Cada URL de origen tiene un manifiesto JSON con las miniaturas generadas. Las
+# plantillas lo consultan (vía cache) con {% responsive_image %}; mientras no
+# existe se muestra la URL original y la tarea images.thumbnails lo genera.
+#
+# IMAGE_FETCHER permite reemplazar la descarga (ruta a una función url -> bytes).
+
+THUMBNAIL_DIR = 'thumbs'
+WIDTHS = tuple(getattr(settings, 'THUMBNAIL_WIDTHS', (320, 640, 960)))
+# Formato Pillow, extensión y opciones de guardado; el primero es el preferido
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+MAX_SOURCE_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT = 10
+MANIFEST_TIMEOUT = 60 * 60 * 24
+# Un manifiesto que todavía no existe se vuelve a buscar en disco tras esto
+MISSING_TIMEOUT = 60
+
+
+def source_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+def _manifest_name(key):
+    return f'{THUMBNAIL_DIR}/{key}/manifest.json'
+
+
+def _cache_key(key):
+    return f'thumbs:{key}'
+
+
+def fetch_url(url):
+    """Descarga la imagen original, con tiempo y tamaño máximos."""
+    if not url.startswith(('http://', 'https://')):
+        raise ValueError(f'URL de imagen no soportada: {url}')
+    request = urllib.request.Request(url, headers={'User-Agent': 'OnlyFlans thumbnailer'})
+    with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+        data = response.read(MAX_SOURCE_BYTES + 1)
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ValueError(f'Imagen demasiado grande: {url}')
+    return data
+
+
+def get_fetcher():
+    path = getattr(settings, 'IMAGE_FETCHER', None)
+    return import_string(path) if path else fetch_url
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _for_format(image, fmt):
+    if not _has_alpha(image):
+        return image.convert('RGB')
+    image = image.convert('RGBA')
+    if fmt == 'webp':
+        return image
+    # JPEG no tiene transparencia: fondo blanco en vez de negro
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_thumbnails(data, widths=WIDTHS):
+    """Miniaturas de la imagen ``data``: ``{formato: [(ancho, bytes), ...]}``.
+
+    No se agranda la imagen: los anchos mayores que el original se omiten y,
+    si no queda ninguno, se usa el ancho original.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source.load()
+        image = ImageOps.exif_transpose(source)
+    width, height = image.size
+    targets = sorted({w for w in widths if w < width} or {width})
+    thumbnails = {fmt: [] for fmt in FORMATS}
+    for target in targets:
+        resized = image.resize((target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, _, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            _for_format(resized, fmt).save(buffer, pil_format, **options)
+            thumbnails[fmt].append((target, buffer.getvalue()))
+    return thumbnails, (width, height)
+
+
+def _save(key, width, fmt, content):
+    extension = FORMATS[fmt][1]
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    name = f'{THUMBNAIL_DIR}/{key}/{width}w.{digest}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def get_manifest(url):
+    """Manifiesto de las miniaturas de ``url`` o ``None`` si aún no existen."""
+    if not url:
+        return None
+    key = source_key(url)
+    manifest = cache.get(_cache_key(key))
+    if manifest is None:
+        name = _manifest_name(key)
+        if default_storage.exists(name):
+            with default_storage.open(name) as file:
+                manifest = json.load(file)
+            cache.set(_cache_key(key), manifest, MANIFEST_TIMEOUT)
+        else:
+            # Se recuerda la ausencia para no consultar el disco en cada render
+            manifest = {}
+            cache.set(_cache_key(key), manifest, MISSING_TIMEOUT)
+    return manifest or None
+
+
+def build_thumbnails(url, fetcher=None):
+    """Descarga ``url`` y genera sus miniaturas si no existen.
+
+    Devuelve ``(manifiesto, creado)``.
+    """
+    manifest = get_manifest(url)
+    if manifest is not None:
+        return manifest, False
+    key = source_key(url)
+    thumbnails, (width, height) = render_thumbnails((fetcher or get_fetcher())(url))
+    manifest = {'source': url, 'width': width, 'height': height}
+    for fmt, sizes in thumbnails.items():
+        manifest[fmt] = [[size, _save(key, size, fmt, content)] for size, content in sizes]
+    name = _manifest_name(key)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(json.dumps(manifest).encode()))
+    cache.set(_cache_key(key), manifest, MANIFEST_TIMEOUT)
+    return manifest, True
+
+
+def srcset(manifest, fmt):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in manifest[fmt])
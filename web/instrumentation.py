@@ -0,0 +1,91 @@
+import contextvars
+import time
+
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+# Métricas de la petición en curso. PerformanceMiddleware crea un RequestMetrics
+# por petición muestreada; el resto del código sólo informa a través de las
+# funciones record_* y de execute_wrapper, que no hacen nada cuando la petición
+# no se muestrea.
+
+_current = contextvars.ContextVar('web_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install(connection):
+    """Instala execute_wrapper en una conexión (señal connection_created).
+
+    Queda instalado de forma permanente en vez de envolver cada petición con
+    connection.execute_wrapper(): en vistas async las consultas corren en otro
+    hilo, con otra conexión, pero el contextvar de la petición llega igual.
+    """
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def record_cache(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def record_template(duration):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.template_time += duration
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record_template(time.perf_counter() - start)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Backend DjangoTemplates que mide el tiempo de renderizado."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
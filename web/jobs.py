@@ -0,0 +1,144 @@
+import logging
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+# Cola de trabajos en la base de datos, sin broker externo. Las vistas encolan
+# con enqueue() y el comando run_jobs los ejecuta por lotes. Un trabajo que
+# falla se reintenta con espera exponencial hasta max_attempts; después queda
+# como FAILED con el último error para revisarlo en el admin.
+#
+# Los trabajos se reclaman con un UPDATE condicionado al estado PENDING y un
+# identificador del worker, así que varios workers no ejecutan el mismo
+# trabajo (en PostgreSQL además se salta las filas bloqueadas por otro).
+#
+# Sin un proceso `manage.py run_jobs` corriendo no se ejecuta nada: los
+# mensajes de contacto, por ejemplo, no se guardan ni se notifican.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 20
+RETRY_BASE_DELAY = getattr(settings, 'JOB_RETRY_BASE_DELAY', 10)   # segundos
+RETRY_MAX_DELAY = getattr(settings, 'JOB_RETRY_MAX_DELAY', 60 * 60)
+# Un trabajo RUNNING más viejo que esto es de un worker que murió
+STALE_AFTER = timedelta(seconds=getattr(settings, 'JOB_STALE_AFTER', 60 * 10))
+# Los trabajos terminados se borran pasado este tiempo (prune_done)
+KEEP_DONE = timedelta(days=getattr(settings, 'JOB_KEEP_DONE_DAYS', 7))
+
+TASKS = {}
+
+
+def task(name):
+    """Registra una función como tarea: ``@task('contact.persist')``."""
+    def decorator(func):
+        TASKS[name] = func
+        func.task_name = name
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, delay=None, max_attempts=5):
+    if name not in TASKS:
+        raise KeyError(f'Tarea desconocida: {name}')
+    run_at = timezone.now() + delay if delay else timezone.now()
+    return Job.objects.create(task=name, payload=payload or {}, run_at=run_at, max_attempts=max_attempts)
+
+
+def retry_delay(attempts):
+    """Espera antes del siguiente intento: exponencial, con tope y jitter."""
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def requeue_stale():
+    """Devuelve a la cola los trabajos de workers muertos que aún tienen intentos.
+
+    Un trabajo que mata al worker cada vez se marca FAILED al agotarlos, en
+    vez de reintentarse para siempre.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - STALE_AFTER)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None, finished_at=now,
+        last_error='El worker terminó sin completar el trabajo',
+    )
+    return stale.filter(attempts__lt=F('max_attempts')).update(status=Job.PENDING, locked_by='', locked_at=None)
+
+
+def prune_done(keep=KEEP_DONE):
+    """Borra los trabajos terminados hace más de ``keep``. Devuelve cuántos."""
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - keep).delete()
+    return deleted
+
+
+def claim(batch_size=DEFAULT_BATCH_SIZE, worker=None):
+    """Reserva hasta ``batch_size`` trabajos vencidos para este worker."""
+    worker = worker or uuid.uuid4().hex
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status=Job.PENDING, run_at__lte=now).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        Job.objects.filter(id__in=ids, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1
+        )
+    return list(Job.objects.filter(id__in=ids, status=Job.RUNNING, locked_by=worker).order_by('run_at', 'id'))
+
+
+def run_job(job):
+    """Ejecuta un trabajo reclamado y registra el resultado. Devuelve si tuvo éxito."""
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise KeyError(f'Tarea desconocida: {job.task}')
+        func(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.locked_by = ''
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+            logger.warning('Job %s (%s) failed, attempt %s/%s', job.pk, job.task, job.attempts, job.max_attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            logger.error('Job %s (%s) failed permanently', job.pk, job.task)
+        job.save(update_fields=['status', 'run_at', 'last_error', 'locked_by', 'locked_at', 'finished_at'])
+        return False
+    job.status = Job.DONE
+    job.finished_at = timezone.now()
+    job.last_error = ''
+    job.save(update_fields=['status', 'finished_at', 'last_error'])
+    return True
+
+
+def run_batch(batch_size=DEFAULT_BATCH_SIZE, worker=None):
+    """Reclama y ejecuta un lote. Devuelve ``(ejecutados, fallidos)``."""
+    failed = 0
+    jobs = claim(batch_size, worker)
+    for job in jobs:
+        if not run_job(job):
+            failed += 1
+    return len(jobs), failed
+
+
+def run_pending(batch_size=DEFAULT_BATCH_SIZE):
+    """Ejecuta lotes hasta que no queden trabajos vencidos (tests, --once)."""
+    total = failed = 0
+    worker = uuid.uuid4().hex
+    while True:
+        ran, batch_failed = run_batch(batch_size, worker)
+        if not ran:
+            return total, failed
+        total += ran
+        failed += batch_failed
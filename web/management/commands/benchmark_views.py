@@ -0,0 +1,73 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from onlyfans.urls import urlpatterns
+from web import benchmarks, seeding
+
+class Command(BaseCommand):
+    help = 'Benchmark query count, latency and memory of every URL on a seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flans', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--reviews', type=int, default=5000)
+        parser.add_argument('--cart-items', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--route', action='append', dest='routes', help='Only benchmark this route (repeatable)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--budgets', help='JSON file with per-route budgets overriding the defaults')
+
+    def handle(self, *args, **options):
+        budgets = benchmarks.BUDGETS
+        if options['budgets']:
+            with open(options['budgets']) as f:
+                budgets = json.load(f)
+
+        # Igual que el runner de tests: nunca se toca la base de datos real, y
+        # tampoco la cache configurada (cache.clear()) ni MEDIA_ROOT (miniaturas)
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}},
+            ):
+                self.stdout.write('Seeding benchmark dataset...')
+                seeding.seed_load_data(
+                    users=options['users'],
+                    flans=options['flans'],
+                    reviews=options['reviews'],
+                    cart_items=options['cart_items'],
+                    seed=options['seed'],
+                    prefix='bench',
+                )
+                dataset = benchmarks.build_fixtures()
+                try:
+                    results = benchmarks.run_benchmarks(
+                        urlpatterns, dataset, iterations=options['iterations'], routes=options['routes']
+                    )
+                except ValueError as e:
+                    raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            self.stdout.write(
+                f"{result['route']:<22} {result['status']} queries={result['queries']:<3} "
+                f"warm={result['queries_warm']:<5} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                f"mem={result['memory_kib']}KiB"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'results': results}, f, indent=2)
+
+        violations = benchmarks.check_budgets(results, budgets)
+        if violations:
+            raise CommandError('Budget exceeded:\n' + '\n'.join(violations))
+        self.stdout.write(self.style.SUCCESS('All routes within budget'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from web import images
+from web.models import Flan
+from web.tasks import build_thumbnails
+
+class Command(BaseCommand):
+    help = 'Download flan images once and build their WebP/JPEG thumbnails'
+
+    def handle(self, *args, **kwargs):
+        urls = Flan.objects.exclude(image_url='').order_by().values_list('image_url', flat=True).distinct()
+        built = failed = 0
+        for url in urls.iterator():
+            if images.get_manifest(url) is not None:
+                continue
+            try:
+                build_thumbnails(url)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'{url}: {exc}')
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'Successfully built thumbnails for {built} images ({failed} failed)'))
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from web.models import Flan
+from web.catalog_io import import_flans
 
 class Command(BaseCommand):
     help = 'Create initial flans for testing'
@@ -11,10 +11,6 @@ class Command(BaseCommand):
             {'name': 'Flan de Queso', 'description': 'Flan cremoso de queso', 'price': 2800.00, 'slug': 'flan-queso'},
         ]
 
-        for flan_data in flans:
-            Flan.objects.update_or_create(
-                slug=flan_data['slug'],
-                defaults=dict(flan_data, is_private=False)
-            )
+        import_flans((i, dict(flan_data, is_private=False)) for i, flan_data in enumerate(flans, start=1))
 
         self.stdout.write(self.style.SUCCESS('Successfully created or updated initial flans'))
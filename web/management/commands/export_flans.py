@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from web import catalog_io
+
+class Command(BaseCommand):
+    help = 'Export every flan to a CSV or JSONL file, streaming the queryset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, or '-' for stdout")
+        parser.add_argument('--format', choices=catalog_io.FORMATS, help='Defaults to the file extension')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or catalog_io.detect_format(path)
+        if fmt is None:
+            raise CommandError('Cannot detect the format, use --format')
+
+        if path == '-':
+            catalog_io.export_flans(self.stdout, fmt)
+            return
+        try:
+            with open(path, 'w', newline='', encoding='utf-8') as stream:
+                count = catalog_io.export_flans(stream, fmt)
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Successfully exported {count} flans to {path}'))
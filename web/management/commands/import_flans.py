@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from web import catalog_io
+
+class Command(BaseCommand):
+    help = 'Upsert flans by slug from a CSV or JSONL file, streaming it in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV/JSONL file, or '-' for stdin")
+        parser.add_argument('--format', choices=catalog_io.FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=catalog_io.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without writing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or catalog_io.detect_format(path)
+        if fmt is None:
+            raise CommandError('Cannot detect the format, use --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        def progress(report):
+            self.stdout.write(f'{report.rows} rows ({report.rows_per_second:.0f} rows/s)')
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            report = catalog_io.import_flans(
+                catalog_io.read_rows(stream, fmt),
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                progress=progress,
+            )
+        except OSError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in report.errors:
+            self.stderr.write(error)
+        prefix = 'Dry run: would have imported' if options['dry_run'] else 'Successfully imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {report.rows} flans ({report.created} new, {report.updated} updated, '
+            f'{len(report.errors)} errors) in {report.elapsed:.1f}s, {report.rows_per_second:.0f} rows/s'
+        ))
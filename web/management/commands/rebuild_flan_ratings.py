@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from web.caching import invalidate_catalog
+from web.ratings import rebuild_rating_aggregates
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized rating_sum/review_count of every flan'
+
+    def handle(self, *args, **kwargs):
+        updated = rebuild_rating_aggregates()
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt ratings for {updated} flans'))
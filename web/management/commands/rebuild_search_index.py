@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from web.search import get_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the flans'
+
+    def handle(self, *args, **kwargs):
+        backend = get_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt the search index ({type(backend).__name__})'))
@@ -0,0 +1,50 @@
+import time
+import uuid
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from web import jobs
+
+# Cada cuánto se borran los trabajos terminados viejos mientras se hace polling
+PRUNE_INTERVAL = 60 * 60
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in batches, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=jobs.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit when no jobs are due instead of polling')
+        parser.add_argument(
+            '--keep-done-days', type=float, default=jobs.KEEP_DONE.total_seconds() / 86400,
+            help='Delete finished jobs older than this many days (0 keeps them)',
+        )
+
+    def handle(self, *args, **options):
+        worker = uuid.uuid4().hex
+        total = failed = 0
+        keep = timedelta(days=options['keep_done_days'])
+        last_prune = None
+        try:
+            while True:
+                if keep and (last_prune is None or time.monotonic() - last_prune >= PRUNE_INTERVAL):
+                    pruned = jobs.prune_done(keep)
+                    last_prune = time.monotonic()
+                    if pruned:
+                        self.stdout.write(f'Pruned {pruned} finished jobs')
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    self.stdout.write(f'Requeued {requeued} stale jobs')
+                ran, batch_failed = jobs.run_batch(options['batch_size'], worker)
+                total += ran
+                failed += batch_failed
+                if ran:
+                    self.stdout.write(f'Ran {ran} jobs ({batch_failed} failed)')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Successfully ran {total} jobs ({failed} failed)'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from web import seeding
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (users, flans, reviews, cart items) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--flans', type=int, default=10000)
+        parser.add_argument('--reviews', type=int, default=100000)
+        parser.add_argument('--cart-items', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='load', help='Prefix of the generated usernames and slugs')
+        parser.add_argument('--batch-size', type=int, default=seeding.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        def progress(model_name, rows):
+            self.stdout.write(f'{model_name}: {rows} rows')
+
+        try:
+            # Una sola transacción: mucho más rápido en SQLite y, si algo
+            # falla, no queda un conjunto de datos a medias.
+            with transaction.atomic():
+                counts = seeding.seed_load_data(
+                    users=options['users'],
+                    flans=options['flans'],
+                    reviews=options['reviews'],
+                    cart_items=options['cart_items'],
+                    seed=options['seed'],
+                    prefix=options['prefix'],
+                    batch_size=options['batch_size'],
+                    progress=progress,
+                )
+        except IntegrityError as e:
+            raise CommandError(f'{e} (already seeded with this --prefix?)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully seeded {counts['users']} users, {counts['flans']} flans, {counts['reviews']} reviews "
+            f"and {counts['cart_items']} cart items in {counts['seconds']}s"
+        ))
@@ -0,0 +1,175 @@
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from . import routers, users
+from .cart import GuestCart
+from .instrumentation import RequestMetrics
+
+performance_logger = logging.getLogger('web.performance')
+
+# Los middlewares funcionan con WSGI y con ASGI: con uno sólo síncrono en la
+# cadena, Django ejecutaría las vistas async en un hilo aparte.
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class GuestCartMiddleware:
+    """Expone ``request.guest_cart`` y persiste sus cambios en la cookie."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.guest_cart = GuestCart(request)
+        response = self.get_response(request)
+        request.guest_cart.save(response)
+        return response
+
+    async def __acall__(self, request):
+        request.guest_cart = GuestCart(request)
+        response = await self.get_response(request)
+        request.guest_cart.save(response)
+        return response
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware con el usuario leído de la cache (web/users.py)."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _cached_user(request))
+
+
+def _cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = users.get_user(request)
+    return request._cached_user
+
+
+class ReplicaStickinessMiddleware:
+    """Lecturas del primario durante un rato después de una escritura.
+
+    Una petición que puede escribir (POST, etc.) deja la cookie
+    ``REPLICA_STICKY_COOKIE`` por ``REPLICA_STICKY_SECONDS``; mientras el
+    cliente la envía, y durante la propia escritura, web/routers.py no manda
+    sus lecturas a las réplicas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'REPLICA_STICKY_COOKIE', 'use_primary')
+        self.seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sticky(self, request):
+        return request.method not in SAFE_METHODS or self.cookie_name in request.COOKIES
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routers.use_primary(self._sticky(request)):
+            response = self.get_response(request)
+        return self._mark(request, response)
+
+    async def __acall__(self, request):
+        with routers.use_primary(self._sticky(request)):
+            response = await self.get_response(request)
+        return self._mark(request, response)
+
+    def _mark(self, request, response):
+        if request.method not in SAFE_METHODS and routers.replicas():
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.seconds,
+                secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class PerformanceMiddleware:
+    """Mide consultas, plantillas, cache y tiempo total de una muestra de peticiones.
+
+    Los resultados salen en la cabecera ``Server-Timing`` y como una línea JSON
+    en el logger ``web.performance``, etiquetada con el nombre de la URL. Debe
+    ir primero en MIDDLEWARE para que el tiempo total incluya todo lo demás.
+    Las consultas se cuentan con instrumentation.execute_wrapper, instalado en
+    cada conexión desde web/signals.py.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 1.0)
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = metrics.activate()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            RequestMetrics.deactivate(token)
+        return self._report(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = metrics.activate()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            RequestMetrics.deactivate(token)
+        return self._report(request, response, metrics, time.perf_counter() - start)
+
+    def _report(self, request, response, metrics, total):
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.view_name if match else None) or 'unresolved'
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+                f'tpl;dur={metrics.template_time * 1000:.1f}',
+                f'cache;desc="hits={metrics.cache_hits} misses={metrics.cache_misses}"',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        performance_logger.info(json.dumps({
+            'url_name': url_name,
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }))
+        return response
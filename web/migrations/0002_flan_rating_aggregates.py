@@ -0,0 +1,46 @@
+# Generated by Django 4.2.24 on 2026-10-18 17:08
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    Flan = apps.get_model('web', 'Flan')
+    Review = apps.get_model('web', 'Review')
+
+    def review_subquery(aggregate):
+        reviews = (
+            Review.objects.filter(flan=OuterRef('pk'))
+            .order_by()
+            .values('flan')
+            .annotate(total=aggregate)
+            .values('total')
+        )
+        return Coalesce(Subquery(reviews, output_field=IntegerField()), Value(0))
+
+    Flan.objects.update(
+        rating_sum=review_subquery(Sum('rating')),
+        review_count=review_subquery(Count('id')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flan',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='flan',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
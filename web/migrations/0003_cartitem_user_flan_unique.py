@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-18 17:10
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    # Antes de la restricción podían existir varias filas para el mismo flan
+    CartItem = apps.get_model('web', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('user_id', 'flan_id')
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('quantity'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        items = CartItem.objects.filter(user_id=row['user_id'], flan_id=row['flan_id'])
+        items.exclude(id=row['keep']).delete()
+        items.filter(id=row['keep']).update(quantity=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0002_flan_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'flan'), name='web_cartitem_user_flan_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0003_cartitem_user_flan_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flan',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0004_flan_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flan',
+            index=models.Index(condition=models.Q(('is_private', False)), fields=['name', 'id'], name='web_flan_public_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flan',
+            index=models.Index(condition=models.Q(('is_private', True)), fields=['name', 'id'], name='web_flan_private_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flan',
+            index=models.Index(condition=models.Q(('is_private', False)), fields=['updated_at'], name='web_flan_public_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['flan', '-created_at', '-id'], name='web_review_flan_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='web_review_user_recent_idx'),
+        ),
+    ]
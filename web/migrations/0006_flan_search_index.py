@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# El índice de búsqueda depende del motor (ver web/search.py), así que no es
+# parte del modelo: se crea aquí sólo donde existe.
+
+SQLITE_CREATE = [
+    # rowid = id del flan; is_private se guarda sin indexar para filtrar
+    # los resultados sin unir con web_flan. El índice de prefijos acelera la
+    # búsqueda de la palabra que se está escribiendo.
+    "CREATE VIRTUAL TABLE web_flan_fts USING fts5("
+    "name, description, is_private UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "INSERT INTO web_flan_fts (rowid, name, description, is_private) "
+    "SELECT id, name, description, is_private FROM web_flan",
+]
+SQLITE_DROP = ["DROP TABLE IF EXISTS web_flan_fts"]
+
+POSTGRESQL_CREATE = [
+    "ALTER TABLE web_flan ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('spanish', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX web_flan_search_vector_idx ON web_flan USING GIN (search_vector)",
+]
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS web_flan_search_vector_idx",
+    "ALTER TABLE web_flan DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}),
+            _run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+    ]
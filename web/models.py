@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 import uuid
+from django.utils import timezone
 
 class Flan(models.Model):
     flan_uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
@@ -10,10 +11,34 @@ class Flan(models.Model):
     slug = models.SlugField(unique=True)
     is_private = models.BooleanField(default=False)
     price = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+    # Agregados de reseñas mantenidos por señales (ver web/signals.py)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    # También se actualiza cuando cambian sus reseñas: valida las respuestas
+    # condicionales (ETag/Last-Modified) de las páginas que muestran el flan.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Catálogos público y privado (get_catalog, paginación por cursor
+            # sobre (name, id)). Son parciales porque Django filtra el booleano
+            # como "NOT is_private", que SQLite no busca en un índice compuesto
+            # (is_private, name) pero sí reconoce como condición de índice.
+            models.Index(fields=['name', 'id'], condition=models.Q(is_private=False), name='web_flan_public_name_idx'),
+            models.Index(fields=['name', 'id'], condition=models.Q(is_private=True), name='web_flan_private_name_idx'),
+            # MAX(updated_at) del catálogo público (validadores condicionales)
+            models.Index(fields=['updated_at'], condition=models.Q(is_private=False), name='web_flan_public_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 1)
+
 # Remove Product model entirely
 
 class CartItem(models.Model):
@@ -21,6 +46,12 @@ class CartItem(models.Model):
     flan = models.ForeignKey(Flan, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            # Una sola fila por flan en el carrito: permite el upsert atómico
+            models.UniqueConstraint(fields=['user', 'flan'], name='web_cartitem_user_flan_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.flan.name}"
 
@@ -39,5 +70,47 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Reseñas de un flan o de un usuario, de la más reciente a la más antigua
+            models.Index(fields=['flan', '-created_at', '-id'], name='web_review_flan_recent_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='web_review_user_recent_idx'),
+        ]
+
     def __str__(self):
         return f'Review by {self.user} for {self.flan}'
+
+class Job(models.Model):
+    """Trabajo en segundo plano de la cola en base de datos (ver web/jobs.py)."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (RUNNING, 'En ejecución'),
+        (DONE, 'Terminado'),
+        (FAILED, 'Fallido'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Trabajos pendientes por orden de ejecución (lo que consulta el worker)
+            models.Index(fields=['run_at', 'id'], condition=models.Q(status='pending'), name='web_job_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.status})'
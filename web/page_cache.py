@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import re
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from .caching import aget_versions, bump_version, get_versions
+from .instrumentation import record_cache
+from .routers import use_primary
+
+# Cache de páginas completas para visitantes anónimos. Cada página se etiqueta
+# con claves sustitutas ("catalog", "flan:<id>") cuya versión forma parte de la
+# clave de cache: purgar una etiqueta es incrementar su versión, y sólo dejan de
+# servirse las páginas que la llevan.
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+# Tiempo que un CDN puede servir la página sin volver a preguntar
+PAGE_CACHE_SHARED_MAX_AGE = getattr(settings, 'PAGE_CACHE_SHARED_MAX_AGE', 60)
+
+# El token CSRF es distinto para cada visitante: se guarda un marcador en su
+# lugar y se reemplaza por el token del visitante al servir la página.
+CSRF_PLACEHOLDER = b'__page_cache_csrf_token__'
+_CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _tag_namespace(tag):
+    return f'page:tag:{tag}'
+
+
+def purge_tags(*tags):
+    for tag in tags:
+        bump_version(_tag_namespace(tag))
+
+
+def is_cacheable_request(request):
+    """Sólo se cachean GET/HEAD de visitantes sin estado propio en la página."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # El contador del carrito y los mensajes cambian la página del visitante
+    if getattr(request, 'guest_cart', None):
+        return False
+    return 'messages' not in request.COOKIES
+
+
+async def ais_cacheable_request(request):
+    # request.user se resuelve con consultas síncronas: fuera del event loop
+    return await sync_to_async(is_cacheable_request)(request)
+
+
+def _page_key(request, versions):
+    url = request.build_absolute_uri().encode()
+    digest = hashlib.md5(url, usedforsecurity=False).hexdigest()
+    return f'page:{digest}:' + '.'.join(str(v) for v in versions)
+
+
+def _add_headers(response, tags, entry):
+    response['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    if tags:
+        response['Surrogate-Key'] = ' '.join(tags)
+    if CSRF_PLACEHOLDER in entry['content']:
+        # Lleva el token CSRF (y quizá la cookie) del visitante: un CDN o proxy
+        # compartido no debe guardarla. Sólo se comparte la cache del servidor.
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=0, s_maxage=PAGE_CACHE_SHARED_MAX_AGE, must_revalidate=True
+        )
+    patch_vary_headers(response, ('Cookie',))
+
+
+def _uncached(response):
+    patch_cache_control(response, private=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _entry(response):
+    """Lo que se guarda de una respuesta, o None si no se puede cachear."""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    content = _CSRF_INPUT_RE.sub(rb'\1' + CSRF_PLACEHOLDER + rb'\2', response.content)
+    etag = response.get('ETag') or '"%s"' % hashlib.md5(content, usedforsecurity=False).hexdigest()
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'etag': etag,
+        'last_modified': parse_http_date_safe(response.get('Last-Modified')),
+    }
+
+
+def _not_modified(request, entry, tags):
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if response is not None:
+        _add_headers(response, tags, entry)
+    return response
+
+
+def _serve(request, entry, tags):
+    content = entry['content']
+    if CSRF_PLACEHOLDER in content:
+        # get_token() además hace que CsrfViewMiddleware envíe la cookie
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    response = HttpResponse(content, content_type=entry['content_type'])
+    _add_headers(response, tags, entry)
+    return response
+
+
+def cache_page_for_anonymous(tags=(), timeout=None):
+    """Cachea la respuesta completa de la vista para visitantes anónimos.
+
+    ``tags`` es una lista de claves sustitutas o una función que las calcula a
+    partir de los argumentos de la vista. Las respuestas para usuarios
+    autenticados no se cachean y se marcan como privadas. Sirve también para
+    vistas async, con lecturas de cache async.
+    """
+    if timeout is None:
+        timeout = PAGE_CACHE_TIMEOUT
+
+    def page_tags(request, *args, **kwargs):
+        return list(tags(request, *args, **kwargs) if callable(tags) else tags)
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not await ais_cacheable_request(request):
+                    return _uncached(await view_func(request, *args, **kwargs))
+
+                tags_ = page_tags(request, *args, **kwargs)
+                key = _page_key(request, await aget_versions([_tag_namespace(tag) for tag in tags_]))
+                entry = await cache.aget(key)
+                record_cache(entry is not None)
+                if entry is None:
+                    # Lo que se va a cachear se lee del primario (ver web/caching.py)
+                    with use_primary():
+                        response = await view_func(request, *args, **kwargs)
+                    entry = _entry(response)
+                    if entry is None:
+                        return response
+                    await cache.aset(key, entry, timeout)
+                else:
+                    not_modified = _not_modified(request, entry, tags_)
+                    if not_modified is not None:
+                        return not_modified
+                return _serve(request, entry, tags_)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return _uncached(view_func(request, *args, **kwargs))
+
+            tags_ = page_tags(request, *args, **kwargs)
+            key = _page_key(request, get_versions([_tag_namespace(tag) for tag in tags_]))
+            entry = cache.get(key)
+            record_cache(entry is not None)
+            if entry is None:
+                with use_primary():
+                    response = view_func(request, *args, **kwargs)
+                entry = _entry(response)
+                if entry is None:
+                    return response
+                cache.set(key, entry, timeout)
+            else:
+                not_modified = _not_modified(request, entry, tags_)
+                if not_modified is not None:
+                    return not_modified
+            return _serve(request, entry, tags_)
+        return wrapper
+    return decorator
@@ -0,0 +1,205 @@
+import datetime
+import decimal
+import json
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Paginación por cursor (keyset): en vez de OFFSET, cada página filtra a partir
+# de los valores de ordenamiento de la última fila vista, de modo que la página
+# 1000 cuesta lo mismo que la primera si existe un índice sobre esas columnas.
+
+CURSOR_SALT = 'web.pagination.cursor'
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def estimate_count(queryset):
+    """Número aproximado de filas según el planificador, sin COUNT(*).
+
+    Sólo PostgreSQL expone una estimación útil; en otros motores devuelve None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator por número de página (el del admin) sin COUNT(*) completo.
+
+    Con más de ``exact_threshold`` filas usa la estimación del planificador.
+    Donde no la hay cuenta como mucho ``max_count`` filas; las páginas más
+    allá de ese tope no se pueden abrir (hay que filtrar o buscar).
+    """
+
+    exact_threshold = 10000
+    max_count = 100000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= self.exact_threshold:
+            return estimate
+        return self.object_list[:self.max_count].count()
+
+
+class CursorPaginator:
+    """Pagina un queryset por cursor opaco sobre un ordenamiento único.
+
+    ``ordering`` debe identificar cada fila de forma única, por eso siempre
+    termina en ``id`` (p. ej. ``('name', 'id')`` o ``('-created_at', '-id')``).
+    ``count_mode`` puede ser ``None`` (no contar), ``'estimate'`` (estimación
+    del planificador, sin COUNT(*)) o ``'exact'``.
+    """
+
+    def __init__(self, queryset, ordering, per_page=10, count_mode=None):
+        if count_mode not in (None, 'estimate', 'exact'):
+            raise ValueError(f'count_mode inválido: {count_mode!r}')
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.count_mode = count_mode
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering
+        ]
+
+    def _model_field(self, name):
+        if name in ('pk', 'id'):
+            return self.queryset.model._meta.pk
+        return self.queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        values = [_encode_value(getattr(obj, name)) for name, _ in self.fields]
+        return signing.dumps({'v': values, 'd': direction}, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, token):
+        """Devuelve ``(valores, dirección)`` o ``None`` si el cursor es inválido."""
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+            values = [
+                self._model_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, data['v'], strict=True)
+            ]
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+        if data.get('d') not in ('next', 'prev'):
+            return None
+        return values, data['d']
+
+    def _seek_filter(self, values, reverse):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), respetando el
+        # sentido de cada columna.
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # La cota redundante a >= x permite al motor empezar la búsqueda en el
+        # índice en vez de recorrerlo desde el principio descartando filas.
+        name, descending = self.fields[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+    def _ordered(self, reverse):
+        if not reverse:
+            return self.queryset.order_by(*self.ordering)
+        return self.queryset.order_by(
+            *[name if descending else f'-{name}' for name, descending in self.fields]
+        )
+
+    def count(self):
+        if self.count_mode == 'exact':
+            return self.queryset.count()
+        if self.count_mode == 'estimate':
+            return estimate_count(self.queryset)
+        return None
+
+    async def acount(self):
+        if self.count_mode == 'exact':
+            return await self.queryset.acount()
+        if self.count_mode == 'estimate':
+            return await sync_to_async(estimate_count)(self.queryset)
+        return None
+
+    def _page_query(self, cursor):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            values, direction = None, 'next'
+        else:
+            values, direction = decoded
+        reverse = direction == 'prev'
+
+        queryset = self._ordered(reverse)
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, reverse))
+        return queryset[:self.per_page + 1], values, reverse
+
+    def _build_page(self, rows, values, reverse, count):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if reverse:
+                # Veníamos de una página posterior, así que siempre hay siguiente
+                next_cursor = self.encode_cursor(rows[-1], 'next')
+                if has_more:
+                    previous_cursor = self.encode_cursor(rows[0], 'prev')
+            else:
+                if has_more:
+                    next_cursor = self.encode_cursor(rows[-1], 'next')
+                if values is not None:
+                    previous_cursor = self.encode_cursor(rows[0], 'prev')
+        return CursorPage(rows, next_cursor, previous_cursor, count)
+
+    def get_page(self, cursor=None):
+        queryset, values, reverse = self._page_query(cursor)
+        return self._build_page(list(queryset), values, reverse, self.count())
+
+    async def aget_page(self, cursor=None):
+        queryset, values, reverse = self._page_query(cursor)
+        rows = [obj async for obj in queryset.aiterator()]
+        return self._build_page(rows, values, reverse, await self.acount())
@@ -0,0 +1,56 @@
+import fnmatch
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+from .assets import BUNDLE_NAME
+
+# Lista de precache del service worker (/sw.js) a partir de staticfiles.json.
+# Los nombres con hash del manifiesto son las URLs que usan las páginas, así que
+# coinciden con lo que el navegador pide; la versión del worker es un hash de la
+# lista y cambia sólo si cambia algún archivo. Al instalarse, el worker copia
+# desde la versión anterior los archivos cuyo hash no cambió y descarga el resto.
+
+PRECACHE_PATTERNS = (
+    BUNDLE_NAME,
+    'web/js/*.js',
+    'OnlyFlans.png',
+    'flan.ico',
+)
+
+
+def _revision(hashed):
+    # "web/js/main.0123456789ab.js" -> "0123456789ab"
+    parts = hashed.rsplit('/', 1)[-1].split('.')
+    return parts[-2] if len(parts) > 2 else parts[0]
+
+
+def precache_entries(hashed_files, url=static):
+    """``[{'url', 'revision'}]`` de los archivos de PRECACHE_PATTERNS en el manifiesto."""
+    entries = []
+    for original in sorted(hashed_files):
+        if any(fnmatch.fnmatch(original, pattern) for pattern in PRECACHE_PATTERNS):
+            entries.append({'url': url(original), 'revision': _revision(hashed_files[original])})
+    return entries
+
+
+def build_manifest(hashed_files, url=static):
+    entries = precache_entries(hashed_files, url)
+    digest = hashlib.sha256(json.dumps(entries, sort_keys=True).encode()).hexdigest()[:12]
+    return {'version': digest, 'assets': entries}
+
+
+@functools.lru_cache(maxsize=None)
+def get_manifest():
+    """Manifiesto de precache del proceso; vacío si no hay staticfiles.json.
+
+    En DEBUG los estáticos no llevan hash y cambian sin avisar: no se precachea.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if settings.DEBUG or not hashed_files:
+        return {'version': 'dev', 'assets': []}
+    return build_manifest(hashed_files)
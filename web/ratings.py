@@ -0,0 +1,40 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Flan, Review
+
+
+def apply_review_delta(flan_id, rating_delta, count_delta):
+    """Actualiza los agregados de un flan en una sola sentencia UPDATE.
+
+    También marca el flan como modificado: sus páginas muestran las reseñas.
+    """
+    Flan.objects.filter(pk=flan_id).update(
+        rating_sum=F('rating_sum') + rating_delta,
+        review_count=F('review_count') + count_delta,
+        updated_at=timezone.now(),
+    )
+
+
+def _review_subquery(aggregate):
+    reviews = (
+        Review.objects.filter(flan=OuterRef('pk'))
+        .order_by()
+        .values('flan')
+        .annotate(total=aggregate)
+        .values('total')
+    )
+    return Coalesce(Subquery(reviews, output_field=IntegerField()), Value(0))
+
+
+def rebuild_rating_aggregates(queryset=None):
+    """Recalcula rating_sum y review_count de todos los flanes en un UPDATE."""
+    if queryset is None:
+        queryset = Flan.objects.all()
+    return queryset.update(
+        rating_sum=_review_subquery(Sum('rating')),
+        review_count=_review_subquery(Count('id')),
+        # Como apply_review_delta: invalida los fragmentos de las tarjetas
+        updated_at=timezone.now(),
+    )
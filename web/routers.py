@@ -0,0 +1,62 @@
+import contextlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Lecturas del catálogo y las reseñas a las réplicas de DATABASE_REPLICAS;
+# escrituras y todo lo demás (sesiones, usuarios, carritos, trabajos) al
+# primario. Van al primario también las lecturas:
+#
+# - dentro de una transacción del primario (leer para luego escribir), y
+# - de un cliente que escribió hace poco (ReplicaStickinessMiddleware), para
+#   que vea sus propios cambios aunque la réplica vaya atrasada.
+#
+# Las caches compartidas (catálogo, páginas, autocompletado) se rellenan desde
+# el primario con use_primary(): si no, tras una invalidación guardarían lo que
+# tenga una réplica atrasada bajo la versión nueva.
+
+REPLICA_MODELS = {'web.flan', 'web.review'}
+
+_use_primary = ContextVar('use_primary', default=False)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+@contextlib.contextmanager
+def use_primary(enabled=True):
+    """Manda todas las lecturas al primario dentro del bloque."""
+    token = _use_primary.set(enabled)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or model._meta.label_lower not in REPLICA_MODELS:
+            return None
+        if _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas tienen los mismos datos que el primario
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # El esquema llega a las réplicas por replicación
+        if db in replicas():
+            return False
+        return None
@@ -0,0 +1,215 @@
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import BooleanField, Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Flan
+
+# Búsqueda de texto completo sobre Flan.name y Flan.description. Cada motor de
+# base de datos tiene su backend con la misma interfaz:
+#
+#   search(query, include_private, limit)  lista de flanes por relevancia
+#   filter(queryset, query)                queryset filtrado, sin ordenar
+#   index(flans) / remove(pks)             mantienen el índice (señales)
+#   rebuild()                              reconstruye el índice completo
+#
+# SQLite usa una tabla FTS5 y PostgreSQL una columna tsvector generada con
+# índice GIN (ambas creadas en la migración 0006). Con otros motores se cae a
+# icontains. SEARCH_BACKEND permite forzar un backend por su ruta.
+
+MAX_TERMS = 8
+DEFAULT_LIMIT = 20
+
+_TERM_RE = re.compile(r'\w+')
+
+
+def search_terms(query):
+    """Palabras de la consulta, sin operadores ni comillas del usuario."""
+    return _TERM_RE.findall(query or '')[:MAX_TERMS]
+
+
+def _in_order(pks, alias):
+    flans = Flan.objects.using(alias).in_bulk(pks)
+    return [flans[pk] for pk in pks if pk in flans]
+
+
+class SearchBackend:
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def connection(self):
+        return connections[self.alias]
+
+    def search(self, query, include_private=False, limit=DEFAULT_LIMIT):
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        raise NotImplementedError
+
+    def index(self, flans):
+        pass
+
+    def remove(self, pks):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Tabla FTS5 ``web_flan_fts`` cuyo rowid es el id del flan.
+
+    Las palabras se buscan por prefijo y sin acentos; bm25 pondera más las
+    coincidencias en el nombre que en la descripción.
+    """
+
+    table = 'web_flan_fts'
+
+    def _match(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        # Sólo la última palabra por prefijo (la que se está escribiendo):
+        # expandir cada palabra multiplica el costo de bm25.
+        return ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+    def search(self, query, include_private=False, limit=DEFAULT_LIMIT):
+        match = self._match(query)
+        if match is None:
+            return []
+        sql = f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s'
+        if not include_private:
+            sql += ' AND is_private = 0'
+        # bm25 es menor cuanto más relevante
+        sql += f' ORDER BY bm25({self.table}, 10.0, 1.0), rowid LIMIT %s'
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, [match, limit])
+            pks = [row[0] for row in cursor.fetchall()]
+        return _in_order(pks, self.alias)
+
+    def filter(self, queryset, query):
+        match = self._match(query)
+        if match is None:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        )
+
+    def index(self, flans):
+        rows = [(flan.pk, flan.name, flan.description, int(flan.is_private)) for flan in flans]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, description, is_private) VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, pks):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description, is_private) '
+                'SELECT id, name, description, is_private FROM web_flan'
+            )
+
+
+class PostgresBackend(SearchBackend):
+    """Columna generada ``search_vector`` con índice GIN.
+
+    PostgreSQL la recalcula en cada escritura, así que no hay nada que
+    sincronizar desde las señales.
+    """
+
+    config = 'spanish'
+
+    def _tsquery(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        # Como en SQLite, sólo la última palabra por prefijo
+        return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+    def _matching(self, queryset, tsquery):
+        return queryset.alias(
+            search_match=RawSQL(
+                'search_vector @@ to_tsquery(%s, %s)', [self.config, tsquery], output_field=BooleanField()
+            )
+        ).filter(search_match=True)
+
+    def search(self, query, include_private=False, limit=DEFAULT_LIMIT):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return []
+        queryset = Flan.objects.using(self.alias)
+        if not include_private:
+            queryset = queryset.filter(is_private=False)
+        queryset = self._matching(queryset, tsquery).annotate(
+            search_rank=RawSQL('ts_rank_cd(search_vector, to_tsquery(%s, %s))', [self.config, tsquery])
+        )
+        return list(queryset.order_by('-search_rank', 'pk')[:limit])
+
+    def filter(self, queryset, query):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return queryset.none()
+        return self._matching(queryset, tsquery)
+
+
+class IContainsBackend(SearchBackend):
+    """Sin índice: cada palabra debe aparecer en el nombre o la descripción."""
+
+    def filter(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        return queryset
+
+    def search(self, query, include_private=False, limit=DEFAULT_LIMIT):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        queryset = Flan.objects.using(self.alias)
+        if not include_private:
+            queryset = queryset.filter(is_private=False)
+        queryset = self.filter(queryset, query)
+        # Primero los que tienen la primera palabra en el nombre
+        queryset = queryset.annotate(
+            search_rank=Case(When(name__icontains=terms[0], then=Value(0)), default=Value(1), output_field=IntegerField())
+        )
+        return list(queryset.order_by('search_rank', 'name', 'pk')[:limit])
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(alias=None):
+    if alias is None:
+        alias = router.db_for_write(Flan)
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)(alias)
+    return BACKENDS.get(connections[alias].vendor, IContainsBackend)(alias)
+
+
+def search_flans(query, include_private=False, limit=DEFAULT_LIMIT):
+    return get_backend(router.db_for_read(Flan)).search(query, include_private, limit)
+
+
+def reindex(queryset):
+    """Vuelve a indexar los flanes del queryset (tras un bulk_create)."""
+    get_backend(queryset.db).index(queryset.only('id', 'name', 'description', 'is_private').iterator())
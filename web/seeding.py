@@ -0,0 +1,147 @@
+import bisect
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from .caching import invalidate_everything
+from .models import CartItem, Flan, Review
+from .ratings import rebuild_rating_aggregates
+from .search import get_backend as get_search_backend
+
+# Datos sintéticos a escala de producción. Todo se genera en lotes con
+# bulk_create a partir de una semilla, así que dos corridas con los mismos
+# parámetros producen los mismos datos y la memoria no crece con el total.
+
+SEED_PASSWORD = 'load-password'
+DEFAULT_BATCH_SIZE = 5000
+PRIVATE_RATIO = 0.1
+
+_ADJECTIVES = ('Clásico', 'Casero', 'Cremoso', 'Doble', 'Light', 'Premium', 'Tradicional', 'Vegano')
+_FLAVORS = ('Coco', 'Queso', 'Dulce de Leche', 'Vainilla', 'Chocolate', 'Café', 'Naranja', 'Caramelo')
+_COMMENTS = (
+    'Riquísimo, lo volvería a pedir.',
+    'Muy bueno pero algo dulce.',
+    'Llegó a tiempo y bien frío.',
+    'No me convenció la textura.',
+    'El mejor flan que probé.',
+)
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _bulk_create(model, objs, batch_size, progress=None):
+    created = 0
+    for batch in _chunked(objs, batch_size):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+        if progress:
+            progress(model._meta.model_name, created)
+    return created
+
+
+class SkewedChoice:
+    """Elige valores con probabilidad ~1/rango (Zipf), como la popularidad real."""
+
+    def __init__(self, values, rng, exponent=1.0):
+        self.values = values
+        self.rng = rng
+        self.cum_weights = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(len(values))))
+
+    def __call__(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.values[bisect.bisect(self.cum_weights, point)]
+
+
+def seed_users(count, prefix, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    # Hashear la contraseña una sola vez: PBKDF2 por usuario tardaría horas
+    password = make_password(SEED_PASSWORD)
+    users = (User(username=f'{prefix}-user-{i}', password=password) for i in range(count))
+    _bulk_create(User, users, batch_size, progress)
+    return list(User.objects.filter(username__startswith=f'{prefix}-user-').order_by('pk').values_list('pk', flat=True))
+
+
+def seed_flans(count, prefix, rng, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    def flans():
+        for i in range(count):
+            adjective = _ADJECTIVES[i % len(_ADJECTIVES)]
+            flavor = _FLAVORS[(i // len(_ADJECTIVES)) % len(_FLAVORS)]
+            yield Flan(
+                name=f'Flan {flavor} {adjective} {i:07d}',
+                slug=f'{prefix}-flan-{i}',
+                description=f'Flan {flavor.lower()} {adjective.lower()} generado para pruebas de carga.',
+                price=rng.randint(500, 5000),
+                is_private=rng.random() < PRIVATE_RATIO,
+            )
+
+    _bulk_create(Flan, flans(), batch_size, progress)
+    return list(Flan.objects.filter(slug__startswith=f'{prefix}-flan-').order_by('pk').values_list('pk', flat=True))
+
+
+def seed_reviews(count, user_ids, flan_ids, rng, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    # Las reseñas se concentran en pocos flanes y las escriben pocos usuarios
+    pick_flan = SkewedChoice(flan_ids, rng)
+    pick_user = SkewedChoice(user_ids, rng, exponent=0.5)
+    reviews = (
+        Review(
+            flan_id=pick_flan(),
+            user_id=pick_user(),
+            # Más cincos que unos, como en cualquier tienda
+            rating=rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 2, 4, 6))[0],
+            comment=rng.choice(_COMMENTS),
+        )
+        for _ in range(count)
+    )
+    return _bulk_create(Review, reviews, batch_size, progress)
+
+
+def seed_cart_items(count, user_ids, flan_ids, rng, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    # Como mucho un item por (usuario, flan): se reparten entre los usuarios y
+    # cada uno elige flanes distintos con la misma popularidad que las reseñas.
+    per_user, extra = divmod(min(count, len(user_ids) * len(flan_ids)), len(user_ids)) if user_ids else (0, 0)
+    pick_flan = SkewedChoice(flan_ids, rng)
+
+    def cart_items():
+        for index, user_id in enumerate(user_ids):
+            wanted = per_user + (1 if index < extra else 0)
+            chosen = set()
+            while len(chosen) < wanted:
+                # Los flanes populares se repiten: completar con uno al azar
+                flan_id = pick_flan() if len(chosen) < len(flan_ids) // 2 else rng.choice(flan_ids)
+                chosen.add(flan_id)
+            for flan_id in sorted(chosen):
+                yield CartItem(user_id=user_id, flan_id=flan_id, quantity=rng.randint(1, 3))
+
+    return _bulk_create(CartItem, cart_items(), batch_size, progress)
+
+
+def seed_load_data(users=200, flans=2000, reviews=5000, cart_items=1000, seed=42,
+                   prefix='load', batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Genera usuarios, flanes, reseñas e items de carrito de forma determinista.
+
+    ``prefix`` distingue los nombres de usuario y slugs generados, para poder
+    sembrar varias veces la misma base. ``progress(modelo, filas)`` se llama
+    después de cada lote. Devuelve el número de filas creadas por modelo.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    user_ids = seed_users(users, prefix, batch_size, progress)
+    flan_ids = seed_flans(flans, prefix, rng, batch_size, progress)
+    counts = {
+        'users': len(user_ids),
+        'flans': len(flan_ids),
+        'reviews': seed_reviews(reviews, user_ids, flan_ids, rng, batch_size, progress) if flan_ids else 0,
+        'cart_items': seed_cart_items(cart_items, user_ids, flan_ids, rng, batch_size, progress) if flan_ids else 0,
+    }
+    # bulk_create no dispara señales: agregados y caches se rehacen aquí
+    rebuild_rating_aggregates()
+    get_search_backend().rebuild()
+    invalidate_everything()
+    counts['seconds'] = round(time.perf_counter() - started, 1)
+    return counts
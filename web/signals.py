@@ -0,0 +1,134 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, instrumentation
+from .caching import bump_version, invalidate_catalog
+from .cart import CART_SUMMARY_NAMESPACE, invalidate_cart_summary, merge_guest_cart
+from .models import CartItem, Flan, Review
+from .page_cache import purge_tags
+from .ratings import apply_review_delta
+from .search import get_backend as get_search_backend
+from .tasks import schedule_thumbnails
+from .users import invalidate_user
+
+
+# Las caches se invalidan al confirmar la transacción: antes, otra petición
+# podría volver a llenarlas con las filas viejas, que quedarían hasta expirar.
+# Tampoco hay nada que invalidar si se revierte.
+
+
+@receiver(post_save, sender=Flan)
+def flan_saved(sender, instance, created, **kwargs):
+    pk, is_private = instance.pk, instance.is_private
+
+    def invalidate():
+        if created:
+            invalidate_catalog(is_private)
+        else:
+            # is_private pudo cambiar: el flan puede haber salido del otro catálogo
+            invalidate_catalog()
+            # y el precio pudo cambiar: los totales de los carritos quedan viejos
+            bump_version(CART_SUMMARY_NAMESPACE)
+        purge_tags('catalog', f'flan:{pk}')
+
+    transaction.on_commit(invalidate, using=kwargs['using'])
+    get_search_backend(kwargs['using']).index([instance])
+    # El índice en memoria no se revierte con un rollback: esperar al commit
+    values = (instance.pk, instance.name, instance.is_private)
+    transaction.on_commit(lambda: autocomplete.flan_changed(*values), using=kwargs['using'])
+    image_url = instance.image_url
+    transaction.on_commit(lambda: schedule_thumbnails(image_url), using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Flan)
+def flan_deleted(sender, instance, **kwargs):
+    pk, is_private = instance.pk, instance.is_private
+
+    def invalidate():
+        invalidate_catalog(is_private)
+        purge_tags('catalog', f'flan:{pk}')
+
+    transaction.on_commit(invalidate, using=kwargs['using'])
+    get_search_backend(kwargs['using']).remove([instance.pk])
+    transaction.on_commit(lambda: autocomplete.flan_removed(pk), using=kwargs['using'])
+
+
+@receiver(pre_save, sender=Review)
+def review_pre_save(sender, instance, raw, **kwargs):
+    # Al editar una reseña hay que conocer la calificación y el flan anteriores
+    # para aplicar sólo la diferencia a los agregados.
+    instance._previous_rating = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    # De la base en la que se escribe, no de una réplica que puede ir atrasada
+    previous = (
+        sender._base_manager.using(kwargs['using'])
+        .filter(pk=instance.pk)
+        .values('flan_id', 'rating')
+        .first()
+    )
+    if previous is not None:
+        instance._previous_rating = (previous['flan_id'], previous['rating'])
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        apply_review_delta(instance.flan_id, instance.rating, 1)
+    else:
+        previous_flan_id, previous_rating = previous
+        if previous_flan_id == instance.flan_id:
+            apply_review_delta(instance.flan_id, instance.rating - previous_rating, 0)
+        else:
+            apply_review_delta(previous_flan_id, -previous_rating, -1)
+            apply_review_delta(instance.flan_id, instance.rating, 1)
+    tags = {'catalog', f'flan:{instance.flan_id}'}
+    if previous is not None:
+        tags.add(f'flan:{previous[0]}')
+    _invalidate_reviews(tags, kwargs['using'])
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_review_delta(instance.flan_id, -instance.rating, -1)
+    _invalidate_reviews({'catalog', f'flan:{instance.flan_id}'}, kwargs['using'])
+
+
+def _invalidate_reviews(tags, using):
+    def invalidate():
+        invalidate_catalog()
+        purge_tags(*sorted(tags))
+
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def cart_item_changed(sender, instance, **kwargs):
+    invalidate_cart_summary(instance.user_id)
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    guest_cart = getattr(request, 'guest_cart', None)
+    if guest_cart is not None:
+        merge_guest_cart(user, guest_cart)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    instrumentation.install(connection)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Cambios de contraseña, is_active, is_staff, last_login...
+    invalidate_user(instance.pk)
@@ -45,6 +45,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Product detail page enhancements
     initializeProductDetail();
 
+    // Lazy loaded reviews on the product detail page
+    initializeReviewStream();
+
+    // Flan name suggestions in the navbar search
+    initializeAutocomplete();
+
     // Scroll effects
     addScrollEffects();
 
@@ -512,7 +518,11 @@ function initializeQuantitySelectors() {
 function updateCartCount() {
     const cartIndicator = document.querySelector('.cart-count');
     if (cartIndicator) {
-        const totalItems = cartItems.reduce((sum, item) => sum + item.quantity, 0);
+        // The server renders the real cart count; the local cart is only a fallback
+        const serverCount = cartIndicator.dataset.count;
+        const totalItems = serverCount !== undefined
+            ? parseInt(serverCount) || 0
+            : cartItems.reduce((sum, item) => sum + item.quantity, 0);
         cartIndicator.textContent = totalItems;
         cartIndicator.style.display = totalItems > 0 ? 'flex' : 'none';
         localStorage.setItem('cartCount', totalItems);
@@ -712,6 +722,121 @@ function initializeProductDetail() {
     }
 }
 
+// Review stream: loads the next chunk of reviews without leaving the page
+function initializeReviewStream() {
+    const loadMore = document.querySelector('.load-more-reviews');
+    const reviewList = document.getElementById('review-list');
+    if (!loadMore || !reviewList) return;
+
+    loadMore.addEventListener('click', function(e) {
+        e.preventDefault();
+        if (this.classList.contains('loading')) return;
+
+        this.classList.add('loading');
+        const url = `${this.dataset.url}?cursor=${encodeURIComponent(this.dataset.cursor)}`;
+
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => {
+                if (!response.ok) throw new Error(response.statusText);
+                return response.json();
+            })
+            .then(data => {
+                reviewList.insertAdjacentHTML('beforeend', data.html);
+                if (data.has_next) {
+                    this.dataset.cursor = data.next_cursor;
+                    this.href = `?cursor=${encodeURIComponent(data.next_cursor)}`;
+                } else {
+                    this.remove();
+                }
+            })
+            .catch(() => {
+                showToast('No se pudieron cargar más reseñas', 'error');
+            })
+            .finally(() => {
+                this.classList.remove('loading');
+            });
+    });
+}
+
+function initializeAutocomplete() {
+    const input = document.querySelector('[data-autocomplete-url]');
+    const list = document.getElementById('navbar-suggestions');
+    if (!input || !list) return;
+
+    let timer = null;
+    let controller = null;
+    let active = -1;
+
+    function close() {
+        list.hidden = true;
+        list.innerHTML = '';
+        active = -1;
+    }
+
+    function highlight(index) {
+        const links = list.querySelectorAll('a');
+        if (!links.length) return;
+        active = (index + links.length) % links.length;
+        links.forEach((link, i) => link.classList.toggle('is-active', i === active));
+    }
+
+    function render(results) {
+        list.innerHTML = '';
+        results.forEach(result => {
+            const item = document.createElement('li');
+            item.setAttribute('role', 'option');
+            const link = document.createElement('a');
+            link.href = result.url;
+            link.textContent = result.name;
+            item.appendChild(link);
+            list.appendChild(item);
+        });
+        active = -1;
+        list.hidden = results.length === 0;
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = this.value.trim();
+        if (!query) {
+            close();
+            return;
+        }
+        // Una petición por pausa al escribir, y la anterior se cancela
+        timer = setTimeout(() => {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            const url = `${input.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`;
+            fetch(url, { headers: { 'Accept': 'application/json' }, signal: controller.signal })
+                .then(response => {
+                    if (!response.ok) throw new Error(response.statusText);
+                    return response.json();
+                })
+                .then(data => render(data.results))
+                .catch(error => {
+                    if (error.name !== 'AbortError') close();
+                });
+        }, 80);
+    });
+
+    input.addEventListener('keydown', function(e) {
+        if (list.hidden) return;
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(active + (e.key === 'ArrowDown' ? 1 : -1));
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            window.location.href = list.querySelectorAll('a')[active].href;
+        } else if (e.key === 'Escape') {
+            close();
+        }
+    });
+
+    document.addEventListener('click', function(e) {
+        if (!input.form.contains(e.target)) close();
+    });
+}
+
 // Enhanced Cart Functions with AJAX simulation
 function addToCart(productId, name, price, image, quantity = 1) {
     // Simulate AJAX call
@@ -159,7 +159,7 @@ class PerformanceOptimizer {
     setupCriticalCSS() {
         // This would typically be handled by build tools
         // For now, we'll just mark critical resources
-        const criticalImages = document.querySelectorAll('.hero-background img, .product-card__image:first-child');
+        const criticalImages = document.querySelectorAll('.hero-background img, .product-card__image:first-child, .product-card > picture:first-child .product-card__image');
         criticalImages.forEach(img => img.classList.add('critical-image'));
     }
 
@@ -0,0 +1,7 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .assets import CSSBundleMixin
+
+
+class BundledStaticFilesStorage(CSSBundleMixin, CompressedManifestStaticFilesStorage):
+    """El storage de WhiteNoise más el paquete de CSS y el CSS crítico."""
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from . import images
+from .caching import cache_is_shared, invalidate_catalog
+from .jobs import enqueue, task
+from .models import ContactForm, Flan, Job
+from .page_cache import purge_tags
+
+# Tareas de la cola de trabajos (web/jobs.py). Se registran al importar este
+# módulo desde WebConfig.ready().
+
+
+@task('contact.persist')
+def persist_contact(email, nombre, mensaje):
+    # El aviso va en otro trabajo: si el SMTP falla y se reintenta, el
+    # mensaje no se guarda dos veces.
+    with transaction.atomic():
+        contact = ContactForm.objects.create(email=email, nombre=nombre, mensaje=mensaje)
+        enqueue('contact.notify', {'contact_id': contact.pk})
+
+
+@task('contact.notify')
+def notify_contact(contact_id):
+    recipients = getattr(settings, 'CONTACT_NOTIFY_EMAILS', None)
+    if not recipients:
+        return
+    contact = ContactForm.objects.get(pk=contact_id)
+    send_mail(
+        subject=f'Nuevo mensaje de contacto de {contact.nombre}',
+        message=f'{contact.nombre} <{contact.email}> escribió:\n\n{contact.mensaje}',
+        from_email=None,
+        recipient_list=recipients,
+    )
+
+
+@task('images.thumbnails')
+def build_thumbnails(url):
+    _, created = images.build_thumbnails(url)
+    if created:
+        # Las tarjetas ya cacheadas (fragmentos, catálogo, páginas) apuntan a
+        # la imagen original: updated_at cambia la clave de sus fragmentos
+        Flan.objects.filter(image_url=url).update(updated_at=timezone.now())
+        # El worker es otro proceso: invalidar sólo sirve si la cache es
+        # compartida. Con una cache por proceso las páginas de cada worker web
+        # muestran las miniaturas cuando expiran sus entradas del catálogo
+        # (CATALOG_CACHE_TIMEOUT) y de páginas (PAGE_CACHE_TIMEOUT).
+        if cache_is_shared():
+            invalidate_catalog()
+            purge_tags('catalog')
+
+
+def schedule_thumbnails(url):
+    """Encola la generación de miniaturas de ``url`` si faltan y no está encolada."""
+    if not url or images.get_manifest(url) is not None:
+        return None
+    pending = Job.objects.filter(task='images.thumbnails', status=Job.PENDING, payload__url=url)
+    if pending.exists():
+        return None
+    return enqueue('images.thumbnails', {'url': url})
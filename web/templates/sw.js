@@ -1,40 +1,31 @@
 // Service Worker for OnlyFlans
-// Basic caching strategy for static assets
-
-const CACHE_NAME = 'onlyflans-v1.0.0';
-const STATIC_CACHE = 'onlyflans-static-v1.0.0';
-const DYNAMIC_CACHE = 'onlyflans-dynamic-v1.0.0';
-
-// Assets to cache immediately
-const STATIC_ASSETS = [
-    '/',
-    '/static/web/css/base.css',
-    '/static/web/css/theme.css',
-    '/static/web/css/components.css',
-    '/static/web/css/layout.css',
-    '/static/web/css/navbar.css',
-    '/static/web/css/hero.css',
-    '/static/web/css/forms.css',
-    '/static/web/css/modals.css',
-    '/static/web/css/gallery.css',
-    '/static/web/js/main.js',
-    '/static/web/js/performance.js',
-    '/static/OnlyFlans.png',
-    '/static/flan.ico'
-];
-
-// Install event - cache static assets
+// Generado por la vista service_worker (web/views.py): la lista de precache
+// y la versión salen de staticfiles.json (ver web/precache.py).
+
+const VERSION = '{{ version }}';
+const STATIC_CACHE = 'onlyflans-static-' + VERSION;
+const DYNAMIC_CACHE = 'onlyflans-dynamic-v1';
+
+// Archivos con hash en el nombre: su contenido nunca cambia
+const PRECACHE = {{ assets|safe }};
+const PRECACHE_URLS = new Set(PRECACHE.map(asset => asset.url));
+
+function isImmutable(url) {
+    return PRECACHE_URLS.has(url.pathname) || url.pathname.startsWith('/media/thumbs/');
+}
+
+// Install event - precache static assets
 self.addEventListener('install', event => {
-    console.log('[SW] Installing service worker');
+    console.log('[SW] Installing service worker', VERSION);
     event.waitUntil(
-        caches.open(STATIC_CACHE)
-            .then(cache => {
-                console.log('[SW] Caching static assets');
-                return cache.addAll(STATIC_ASSETS);
-            })
-            .catch(error => {
-                console.error('[SW] Error caching static assets:', error);
-            })
+        caches.open(STATIC_CACHE).then(cache => Promise.all(PRECACHE.map(asset =>
+            // Mismo hash que en la versión anterior: se copia sin descargarlo
+            caches.match(asset.url).then(cached => cached
+                ? cache.put(asset.url, cached)
+                : cache.add(asset.url))
+        ))).catch(error => {
+            console.error('[SW] Error caching static assets:', error);
+        })
     );
     // Force activation
     self.skipWaiting();
@@ -64,13 +55,13 @@ self.addEventListener('fetch', event => {
     const { request } = event;
     const url = new URL(request.url);
 
-    // Skip cross-origin requests
-    if (url.origin !== location.origin) {
+    // Skip cross-origin and non-GET requests
+    if (url.origin !== location.origin || request.method !== 'GET') {
         return;
     }
 
-    // Cache-first strategy for static assets
-    if (STATIC_ASSETS.includes(url.pathname) || request.destination === 'style' || request.destination === 'script') {
+    // Cache-first para archivos inmutables: una visita repetida no los pide
+    if (isImmutable(url)) {
         event.respondWith(
             caches.match(request)
                 .then(cachedResponse => {
@@ -87,17 +78,11 @@ self.addEventListener('fetch', event => {
                                     .then(cache => cache.put(request, responseClone));
                             }
                             return response;
-                        })
-                        .catch(() => {
-                            // Return offline fallback for critical assets
-                            if (request.destination === 'document') {
-                                return caches.match('/');
-                            }
                         });
                 })
         );
     }
-    // Network-first strategy for dynamic content
+    // Network-first para las páginas: llevan el carrito y el token CSRF
     else {
         event.respondWith(
             fetch(request)
@@ -0,0 +1,30 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join, mark_safe
+
+from web import assets
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def stylesheets(context):
+    """Hojas de estilo del sitio (ver web/assets.py).
+
+    Con el paquete generado: CSS crítico de la plantilla en línea y el paquete
+    cargado sin bloquear el render. Si no, un ``<link>`` por hoja.
+    """
+    critical = assets.load_critical()
+    if critical is None:
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((static(name),) for name in assets.CSS_FILES))
+    href = static(assets.BUNDLE_NAME)
+    css = critical.get(context.template.name) if context.template else None
+    if not css:
+        return format_html('<link rel="stylesheet" href="{}">', href)
+    return format_html(
+        '<style>{}</style>\n'
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        # Generado por nosotros, pero un "</style>" cerraría la etiqueta
+        mark_safe(css.replace('</', '<\\/')), href, href,
+    )
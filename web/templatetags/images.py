@@ -0,0 +1,31 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from web import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(url, sizes='100vw', **attrs):
+    """``<picture>`` con las miniaturas WebP y JPEG de ``url`` (srcset/sizes).
+
+    Mientras las miniaturas no existen, un ``<img>`` con la URL original. Los
+    demás argumentos son atributos del ``<img>``::
+
+        {% responsive_image flan.image_url sizes="(max-width: 768px) 100vw, 300px" alt=flan.name class="..." %}
+    """
+    manifest = images.get_manifest(url)
+    if manifest is None:
+        return format_html('<img src="{}"{}>', url, flatatt(attrs))
+    jpeg = manifest['jpeg']
+    # Para navegadores sin srcset: el ancho intermedio
+    fallback = default_storage.url(jpeg[len(jpeg) // 2][1])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        images.srcset(manifest, 'webp'), sizes,
+        fallback, images.srcset(manifest, 'jpeg'), sizes, flatatt(attrs),
+    )
@@ -1,8 +1,35 @@
-from django.test import TestCase, override_settings
+import asyncio
+import io
+import json
+import os
+import tempfile
+import re
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.text import slugify
 from django.contrib.auth.models import User
-from .models import Flan, CartItem, ContactForm, Review
+from django.core import mail
+from django.core.cache import cache
+from django.utils import timezone
+from PIL import Image
+from onlyfans.urls import urlpatterns
+from .models import Flan, CartItem, ContactForm, Job, Review
 from .forms import ContactFormForm, UserRegisterForm, ReviewForm
+from .caching import aget_catalog_page, catalog_namespace, get_catalog, get_version, invalidate_catalog
+from .pagination import CursorPaginator, EstimatedCountPaginator
+from .page_cache import CSRF_PLACEHOLDER, purge_tags
+from .cart import CART_COOKIE_NAME, add_items, add_to_cart, get_cart_summary
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from . import assets, autocomplete, benchmarks, images, jobs, precache, routers, search, seeding, views
 
 
 class FlanModelTest(TestCase):
@@ -160,6 +187,7 @@ class ViewTests(TestCase):
         }
         response = self.client.post(reverse('contacto'), form_data)
         self.assertRedirects(response, reverse('exito_contacto'))
+        jobs.run_pending()
         self.assertEqual(ContactForm.objects.count(), 1)
 
     def test_add_to_cart_view(self):
@@ -257,8 +285,1410 @@ class IntegrationTests(TestCase):
         }
         response = self.client.post(reverse('contacto'), contact_data)
         self.assertRedirects(response, reverse('exito_contacto'))
+        jobs.run_pending()
         self.assertEqual(ContactForm.objects.count(), 1)
 
         # Check success page
         response = self.client.get(reverse('exito_contacto'))
         self.assertEqual(response.status_code, 200)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flan = Flan.objects.create(name="Flan Cache", slug="flan-cache", is_private=False)
+        self.private_flan = Flan.objects.create(name="Flan Secreto", slug="flan-secreto", is_private=True)
+
+    def test_catalog_split_by_visibility(self):
+        self.assertEqual(get_catalog(is_private=False), [self.flan])
+        self.assertEqual(get_catalog(is_private=True), [self.private_flan])
+
+    def test_index_needs_no_queries_when_warm(self):
+        self.client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, "Flan Cache")
+
+    def test_save_invalidates_catalog(self):
+        get_catalog(is_private=False)
+        self.flan.name = "Flan Renombrado"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flan.save()
+        self.assertEqual(get_catalog(is_private=False)[0].name, "Flan Renombrado")
+
+    def test_visibility_change_moves_flan_between_catalogs(self):
+        get_catalog(is_private=False)
+        get_catalog(is_private=True)
+        self.flan.is_private = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flan.save()
+        self.assertEqual(get_catalog(is_private=False), [])
+        self.assertIn(self.flan, get_catalog(is_private=True))
+
+    def test_invalidation_waits_for_commit(self):
+        get_catalog(is_private=False)
+        self.flan.name = "Flan Renombrado"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.flan.save()
+        # Hasta el commit la cache sigue con la versión anterior
+        self.assertEqual(get_catalog(is_private=False)[0].name, "Flan Cache")
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_catalog(is_private=False)[0].name, "Flan Renombrado")
+
+    def test_delete_invalidates_catalog(self):
+        get_catalog(is_private=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flan.delete()
+        self.assertEqual(get_catalog(is_private=False), [])
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rater', password='12345')
+        self.flan = Flan.objects.create(name="Flan Rating", slug="flan-rating")
+        self.other_flan = Flan.objects.create(name="Otro Flan", slug="otro-flan")
+
+    def test_create_updates_aggregates(self):
+        Review.objects.create(flan=self.flan, user=self.user, rating=4, comment="Bueno")
+        Review.objects.create(flan=self.flan, user=self.user, rating=5, comment="Muy bueno")
+        self.flan.refresh_from_db()
+        self.assertEqual(self.flan.review_count, 2)
+        self.assertEqual(self.flan.rating_sum, 9)
+        self.assertEqual(self.flan.average_rating, 4.5)
+
+    def test_edit_applies_delta(self):
+        review = Review.objects.create(flan=self.flan, user=self.user, rating=2, comment="Regular")
+        review.rating = 5
+        review.save()
+        self.flan.refresh_from_db()
+        self.assertEqual((self.flan.rating_sum, self.flan.review_count), (5, 1))
+
+    def test_moving_review_to_another_flan(self):
+        review = Review.objects.create(flan=self.flan, user=self.user, rating=3, comment="Ok")
+        review.flan = self.other_flan
+        review.save()
+        self.flan.refresh_from_db()
+        self.other_flan.refresh_from_db()
+        self.assertEqual((self.flan.rating_sum, self.flan.review_count), (0, 0))
+        self.assertEqual((self.other_flan.rating_sum, self.other_flan.review_count), (3, 1))
+
+    def test_delete_updates_aggregates(self):
+        review = Review.objects.create(flan=self.flan, user=self.user, rating=4, comment="Bueno")
+        review.delete()
+        self.flan.refresh_from_db()
+        self.assertEqual((self.flan.rating_sum, self.flan.review_count), (0, 0))
+        self.assertIsNone(self.flan.average_rating)
+
+    def test_rebuild_command(self):
+        Review.objects.create(flan=self.flan, user=self.user, rating=4, comment="Bueno")
+        Review.objects.create(flan=self.flan, user=self.user, rating=2, comment="Meh")
+        Flan.objects.update(rating_sum=0, review_count=0)
+        call_command('rebuild_flan_ratings', stdout=StringIO())
+        self.flan.refresh_from_db()
+        self.other_flan.refresh_from_db()
+        self.assertEqual((self.flan.rating_sum, self.flan.review_count), (6, 2))
+        self.assertEqual((self.other_flan.rating_sum, self.other_flan.review_count), (0, 0))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flans = [
+            Flan.objects.create(name=f"Flan {i:02d}", slug=f"flan-{i:02d}")
+            for i in range(25)
+        ]
+        # Nombres repetidos: el id desempata el orden
+        self.flans.append(Flan.objects.create(name="Flan 05", slug="flan-05-bis"))
+        self.paginator = CursorPaginator(
+            Flan.objects.all(), ordering=('name', 'id'), per_page=10
+        )
+
+    def test_walks_forward_and_backward(self):
+        expected = list(Flan.objects.order_by('name', 'id'))
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(first.object_list + second.object_list + third.object_list, expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(back.object_list, second.object_list)
+        self.assertEqual(self.paginator.get_page(back.previous_cursor).object_list, first.object_list)
+
+    def test_descending_ordering(self):
+        paginator = CursorPaginator(Flan.objects.all(), ordering=('-name', '-id'), per_page=10)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        expected = list(Flan.objects.order_by('-name', '-id'))
+        self.assertEqual(first.object_list + second.object_list, expected[:20])
+
+    def test_no_offset_or_count(self):
+        first = self.paginator.get_page()
+        with CaptureQueriesContext(connection) as queries:
+            self.paginator.get_page(first.next_cursor)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_invalid_cursor_returns_first_page(self):
+        page = self.paginator.get_page('no-es-un-cursor')
+        self.assertEqual(page.object_list, self.paginator.get_page().object_list)
+
+    def test_flans_list_cursor_navigation(self):
+        response = self.client.get(reverse('flans_list'))
+        page = response.context['page_obj']
+        self.assertTrue(page.has_next())
+        response = self.client.get(reverse('flans_list'), {'cursor': page.next_cursor})
+        self.assertContains(response, "Flan 09")
+        with self.assertNumQueries(0):
+            self.client.get(reverse('flans_list'), {'cursor': page.next_cursor})
+
+    def test_review_pages_newest_first(self):
+        user = User.objects.create_user(username='paginador', password='12345')
+        for i in range(15):
+            Review.objects.create(flan=self.flans[0], user=user, rating=5, comment=f"Reseña {i}")
+        response = self.client.get(reverse('detalle_flan', args=[self.flans[0].id]))
+        reviews = response.context['reviews']
+        self.assertEqual(len(reviews), 10)
+        self.assertEqual(reviews.object_list[0].comment, "Reseña 14")
+        response = self.client.get(
+            reverse('detalle_flan', args=[self.flans[0].id]), {'cursor': reviews.next_cursor}
+        )
+        self.assertEqual(len(response.context['reviews']), 5)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReviewStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='lector', password='12345')
+        self.flan = Flan.objects.create(name="Flan Popular", slug="flan-popular")
+        for i in range(25):
+            Review.objects.create(flan=self.flan, user=self.user, rating=4, comment=f"Comentario {i}")
+
+    def test_detail_renders_only_first_chunk(self):
+        response = self.client.get(reverse('detalle_flan', args=[self.flan.id]))
+        self.assertContains(response, "Comentario 24")
+        self.assertNotContains(response, "Comentario 14")
+        self.assertContains(response, reverse('detalle_flan_reviews', args=[self.flan.id]))
+
+    def test_endpoint_streams_remaining_reviews(self):
+        response = self.client.get(reverse('detalle_flan', args=[self.flan.id]))
+        cursor = response.context['reviews'].next_cursor
+        url = reverse('detalle_flan_reviews', args=[self.flan.id])
+        comments = []
+        while cursor:
+            data = self.client.get(url, {'cursor': cursor}).json()
+            comments.extend(re.findall(r'Comentario \d+', data['html']))
+            cursor = data['next_cursor']
+        self.assertEqual(comments, [f"Comentario {i}" for i in range(14, -1, -1)])
+
+    def test_endpoint_hides_private_flans_from_anonymous(self):
+        private_flan = Flan.objects.create(name="Privado", slug="privado-stream", is_private=True)
+        response = self.client.get(reverse('detalle_flan_reviews', args=[private_flan.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CartServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='comprador', password='12345')
+        self.flan = Flan.objects.create(name="Flan Carrito", price=1000, slug="flan-carrito")
+        self.other_flan = Flan.objects.create(name="Flan Extra", price=500, slug="flan-extra")
+
+    def test_add_to_cart_is_single_statement(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(add_to_cart(self.user, self.flan.id))
+        with self.assertNumQueries(1):
+            add_to_cart(self.user, self.flan.id, quantity=3)
+        item = CartItem.objects.get(user=self.user, flan=self.flan)
+        self.assertEqual(item.quantity, 4)
+
+    def test_batch_add(self):
+        add_items(self.user, [(self.flan.id, 2), (self.other_flan.id, 1), (self.flan.id, 1)])
+        quantities = dict(CartItem.objects.filter(user=self.user).values_list('flan_id', 'quantity'))
+        self.assertEqual(quantities, {self.flan.id: 3, self.other_flan.id: 1})
+
+    def test_unknown_flan_is_ignored(self):
+        self.assertFalse(add_to_cart(self.user, 999999))
+        self.assertEqual(CartItem.objects.count(), 0)
+
+    def test_invalid_quantity(self):
+        with self.assertRaises(ValueError):
+            add_to_cart(self.user, self.flan.id, quantity=0)
+
+    def test_unique_user_flan(self):
+        CartItem.objects.create(user=self.user, flan=self.flan)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CartItem.objects.create(user=self.user, flan=self.flan)
+
+    def test_view_accepts_quantity(self):
+        self.client.login(username='comprador', password='12345')
+        self.client.post(reverse('add_to_cart', args=[self.flan.id]), {'quantity': 2})
+        self.client.post(reverse('add_to_cart', args=[self.flan.id]))
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 3)
+        response = self.client.post(reverse('add_to_cart', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class GuestCartTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='invitado', password='clave-segura-123')
+        self.flan = Flan.objects.create(name="Flan Invitado", price=1500, slug="flan-invitado")
+        self.private_flan = Flan.objects.create(name="Flan VIP", slug="flan-vip", is_private=True)
+
+    def test_guest_add_does_not_write_to_db(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('add_to_cart', args=[self.flan.id]), {'quantity': 2})
+        self.assertRedirects(response, reverse('carrito'))
+        self.assertTrue(all(q['sql'].lstrip().upper().startswith('SELECT') for q in queries))
+        self.assertIn(CART_COOKIE_NAME, response.cookies)
+        self.assertEqual(CartItem.objects.count(), 0)
+
+        response = self.client.get(reverse('carrito'))
+        self.assertContains(response, "Flan Invitado")
+        self.assertContains(response, "3000")
+
+    def test_guest_cannot_add_private_flan(self):
+        response = self.client.post(reverse('add_to_cart', args=[self.private_flan.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_guest_remove(self):
+        self.client.post(reverse('add_to_cart', args=[self.flan.id]))
+        self.client.post(reverse('remove_from_cart', args=[self.flan.id]))
+        response = self.client.get(reverse('carrito'))
+        self.assertContains(response, "No hay productos en el carrito.")
+
+    def test_tampered_cookie_is_ignored(self):
+        self.client.cookies[CART_COOKIE_NAME] = '{"1": 99}'
+        response = self.client.get(reverse('carrito'))
+        self.assertContains(response, "No hay productos en el carrito.")
+
+    def test_cart_merged_on_login(self):
+        CartItem.objects.create(user=self.user, flan=self.flan, quantity=1)
+        self.client.post(reverse('add_to_cart', args=[self.flan.id]), {'quantity': 2})
+        response = self.client.post(reverse('login'), {'username': 'invitado', 'password': 'clave-segura-123'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(CartItem.objects.get(user=self.user, flan=self.flan).quantity, 3)
+        self.assertEqual(response.cookies[CART_COOKIE_NAME].value, '')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='resumen', password='12345')
+        self.flan = Flan.objects.create(name="Flan Resumen", price=1200, slug="flan-resumen")
+        self.other_flan = Flan.objects.create(name="Flan Barato", price=300, slug="flan-barato")
+
+    def test_totals_aggregated_in_sql(self):
+        add_items(self.user, {self.flan.id: 2, self.other_flan.id: 3})
+        with self.assertNumQueries(1):
+            summary = get_cart_summary(self.user)
+        self.assertEqual(summary['count'], 5)
+        self.assertEqual(summary['total'], Decimal('3300.00'))
+        with self.assertNumQueries(0):
+            get_cart_summary(self.user)
+
+    def test_badge_uses_cache_and_invalidates(self):
+        self.client.login(username='resumen', password='12345')
+        add_to_cart(self.user, self.flan.id, quantity=2)
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, 'data-count="2"')
+        # Sólo la sesión; el usuario y el resumen salen de la cache
+        with self.assertNumQueries(1):
+            self.client.get(reverse('about'))
+        CartItem.objects.filter(user=self.user).delete()
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, 'data-count="0"')
+
+    def test_generic_engine_fallback_invalidates_totals(self):
+        add_to_cart(self.user, self.flan.id)
+        self.assertEqual(get_cart_summary(self.user)['count'], 1)
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            # Sólo incrementa una fila existente: ningún CartItem se guarda
+            add_items(self.user, {self.flan.id: 2})
+        self.assertEqual(get_cart_summary(self.user)['count'], 3)
+
+    def test_price_change_invalidates_totals(self):
+        add_to_cart(self.user, self.flan.id)
+        get_cart_summary(self.user)
+        self.flan.price = 2000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flan.save()
+        self.assertEqual(get_cart_summary(self.user)['total'], Decimal('2000.00'))
+
+    def test_guest_badge_counts_cookie_cart(self):
+        self.client.post(reverse('add_to_cart', args=[self.flan.id]), {'quantity': 4})
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, 'data-count="4"')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cacheado', password='12345')
+        self.flan = Flan.objects.create(name="Flan Página", slug="flan-pagina")
+        self.other_flan = Flan.objects.create(name="Flan Vecino", slug="flan-vecino")
+
+    def detail_url(self, flan):
+        return reverse('detalle_flan', args=[flan.id])
+
+    def test_anonymous_pages_served_from_cache(self):
+        first = self.client.get(self.detail_url(self.flan))
+        with self.assertNumQueries(0):
+            second = self.client.get(self.detail_url(self.flan))
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, "Flan Página")
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(second['Surrogate-Key'], f'flan:{self.flan.id}')
+        self.assertIn('s-maxage', second['Cache-Control'])
+
+    def test_etag_revalidation(self):
+        etag = self.client.get(reverse('about'))['ETag']
+        response = self.client.get(reverse('about'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_review_purges_only_affected_pages(self):
+        self.client.get(self.detail_url(self.flan))
+        self.client.get(self.detail_url(self.other_flan))
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(flan=self.flan, user=self.user, rating=5, comment="Purgado")
+        self.assertContains(self.client.get(self.detail_url(self.flan)), "Purgado")
+        with self.assertNumQueries(0):
+            self.client.get(self.detail_url(self.other_flan))
+
+    def test_flan_change_purges_catalog(self):
+        self.client.get(reverse('index'))
+        self.flan.name = "Flan Renovado"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flan.save()
+        self.assertContains(self.client.get(reverse('index')), "Flan Renovado")
+
+    def test_cached_page_gets_visitor_csrf_token(self):
+        self.client.get(reverse('index'))
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(reverse('index'))
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        self.assertNotIn(CSRF_PLACEHOLDER.decode(), response.content.decode())
+        response = client.post(
+            reverse('add_to_cart', args=[self.flan.id]), {'csrfmiddlewaretoken': token}
+        )
+        self.assertRedirects(response, reverse('carrito'))
+
+    def test_pages_with_csrf_token_are_not_shared(self):
+        for _ in range(2):
+            response = Client().get(reverse('index'))
+            self.assertIn('csrftoken', response.cookies)
+            self.assertIn('private', response['Cache-Control'])
+            self.assertNotIn('public', response['Cache-Control'])
+            self.assertNotIn('s-maxage', response['Cache-Control'])
+        response = Client().get(reverse('index'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_authenticated_users_bypass_cache(self):
+        self.client.get(reverse('index'))
+        self.client.login(username='cacheado', password='12345')
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, "cacheado")
+        self.assertIn('private', response['Cache-Control'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='condicional', password='12345')
+        self.flan = Flan.objects.create(name="Flan Condicional", slug="flan-condicional")
+
+    def test_detail_not_modified_with_single_query(self):
+        url = reverse('detalle_flan', args=[self.flan.id])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        cache.clear()  # sin cache de páginas: responde el validador
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_review_changes_validators(self):
+        url = reverse('detalle_flan', args=[self.flan.id])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(flan=self.flan, user=self.user, rating=3, comment="Nueva")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Nueva")
+
+    def test_catalog_etag_changes_on_delete(self):
+        other = Flan.objects.create(name="Flan Borrable", slug="flan-borrable")
+        etag = self.client.get(reverse('index'))['ETag']
+        purge_tags('catalog')  # sin cache de páginas: responde el validador
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        other.delete()
+        response = self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_users_always_get_full_page(self):
+        self.client.login(username='condicional', password='12345')
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('ETag', response)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+class QueryPlanTests(TestCase):
+    """Las consultas frecuentes de web/views.py no deben volver a recorrer tablas."""
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index_name, seek=True):
+        plan = self.explain(*queryset.query.sql_with_params())
+        self.assertIn(f'INDEX {index_name}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        if seek:
+            self.assertIn('SEARCH', plan)
+
+    def test_catalog_by_visibility(self):
+        self.assertUsesIndex(Flan.objects.filter(is_private=False).order_by('name'), 'web_flan_public_name_idx', seek=False)
+        self.assertUsesIndex(Flan.objects.filter(is_private=True).order_by('name'), 'web_flan_private_name_idx', seek=False)
+
+    def test_catalog_keyset_page_seeks(self):
+        paginator = CursorPaginator(Flan.objects.filter(is_private=False), ordering=('name', 'id'))
+        queryset = paginator._ordered(False).filter(paginator._seek_filter(['Flan M', 42], False))[:11]
+        self.assertUsesIndex(queryset, 'web_flan_public_name_idx')
+
+    def test_reviews_by_recency(self):
+        paginator = CursorPaginator(Review.objects.filter(flan_id=1), ordering=('-created_at', '-id'))
+        self.assertUsesIndex(paginator._ordered(False)[:11], 'web_review_flan_recent_idx')
+        paginator = CursorPaginator(Review.objects.filter(user_id=1), ordering=('-created_at', '-id'))
+        self.assertUsesIndex(paginator._ordered(False)[:11], 'web_review_user_recent_idx')
+
+    def test_cart_by_user(self):
+        plan = self.explain(*CartItem.objects.filter(user_id=1).query.sql_with_params())
+        self.assertIn('SEARCH web_cartitem USING', plan)
+
+    def test_catalog_last_modified(self):
+        sql, params = Flan.objects.filter(is_private=False).values('updated_at').order_by('-updated_at')[:1].query.sql_with_params()
+        self.assertIn('INDEX web_flan_public_updated_idx', self.explain(sql, params))
+        self.assertIn(
+            'web_flan_public_updated_idx',
+            self.explain('SELECT MAX("updated_at") FROM "web_flan" WHERE NOT "is_private"'),
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BenchmarkHarnessTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        missing = set(benchmarks.route_keys(urlpatterns)) - set(benchmarks.SCENARIOS)
+        self.assertEqual(missing, set())
+
+    def test_fixtures_keep_rating_aggregates(self):
+        seeding.seed_load_data(users=5, flans=10, reviews=20, cart_items=5, prefix='bench')
+        flan = benchmarks.build_fixtures()['popular_flan']
+        reviews = Review.objects.filter(flan=flan)
+        self.assertEqual(flan.review_count, reviews.count())
+        self.assertEqual(flan.rating_sum, sum(reviews.values_list('rating', flat=True)))
+
+    def test_small_run_within_query_budgets(self):
+        seeding.seed_load_data(users=5, flans=30, reviews=60, cart_items=10, prefix='bench')
+        dataset = benchmarks.build_fixtures()
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            results = benchmarks.run_benchmarks(urlpatterns, dataset, iterations=2)
+        self.assertEqual(len(results), len(benchmarks.route_keys(urlpatterns)))
+        # Sólo consultas y estado: la latencia depende de la máquina
+        budgets = {route: {'queries': budget['queries']} for route, budget in benchmarks.BUDGETS.items()}
+        self.assertEqual(benchmarks.check_budgets(results, budgets, default={'queries': 10}), [])
+
+    def test_budget_violations_are_reported(self):
+        result = {'route': 'index', 'status': 200, 'queries': 7, 'p95_ms': 1, 'memory_kib': 1}
+        violations = benchmarks.check_budgets([result])
+        self.assertEqual(violations, ['index: queries=7 > 2'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Flan.objects.create(name='Flan', slug='flan', description='d', price=1000)
+
+    def test_server_timing_header(self):
+        with self.assertLogs('web.performance', level='INFO') as logs:
+            response = self.client.get(reverse('index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['url_name'], 'index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+    def test_cache_hits_are_counted(self):
+        self.client.get(reverse('index'))
+        with self.assertLogs('web.performance', level='INFO') as logs:
+            self.client.get(reverse('index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['db_queries'], 0)
+        self.assertGreater(record['cache_hits'], 0)
+        self.assertEqual(record['cache_misses'], 0)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_instrumented(self):
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class CatalogImportExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_import_creates_and_updates(self):
+        flan = Flan.objects.create(name='Viejo', slug='flan-viejo', description='d', price=100)
+        Review.objects.create(flan=flan, user=User.objects.create_user('u', password='x'), rating=4, comment='c')
+        path = self.write('flans.csv', (
+            'slug,name,description,price,is_private\n'
+            'flan-viejo,Renovado,Nueva descripción,150.50,false\n'
+            'flan-nuevo,Nuevo,Otro,200,true\n'
+        ))
+        out = StringIO()
+        call_command('import_flans', path, batch_size=1, stdout=out)
+        self.assertIn('1 new, 1 updated', out.getvalue())
+        flan.refresh_from_db()
+        self.assertEqual((flan.name, flan.price), ('Renovado', Decimal('150.50')))
+        # Los agregados de reseñas no vienen en el archivo y se conservan
+        self.assertEqual(flan.review_count, 1)
+        self.assertTrue(Flan.objects.get(slug='flan-nuevo').is_private)
+
+    def test_partial_rows_keep_missing_columns(self):
+        Flan.objects.create(name='Flan', slug='flan', description='Original', price=100)
+        path = self.write('precios.jsonl', '{"slug": "flan", "price": "120"}\n')
+        call_command('import_flans', path, stdout=StringIO())
+        flan = Flan.objects.get(slug='flan')
+        self.assertEqual((flan.description, flan.price), ('Original', Decimal('120')))
+
+    def test_invalid_and_duplicate_rows(self):
+        path = self.write('flans.jsonl', (
+            '{"slug": "a", "name": "Primero", "price": 10}\n'
+            '{"slug": "a", "name": "Segundo", "price": 10}\n'
+            '{"slug": "no es slug", "name": "X"}\n'
+            'no es json\n'
+            '{"slug": "b", "price": 5}\n'
+        ))
+        out, err = StringIO(), StringIO()
+        call_command('import_flans', path, stdout=out, stderr=err)
+        self.assertEqual(list(Flan.objects.values_list('slug', 'name')), [('a', 'Segundo')])
+        self.assertIn('3 errors', out.getvalue())
+        self.assertIn('línea 3', err.getvalue())
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write('flans.csv', 'slug,name\nseco,Seco\n')
+        out = StringIO()
+        call_command('import_flans', path, dry_run=True, stdout=out)
+        self.assertIn('1 new', out.getvalue())
+        self.assertFalse(Flan.objects.exists())
+
+    def test_import_invalidates_catalog(self):
+        self.assertEqual(get_catalog(), [])
+        path = self.write('flans.csv', 'slug,name\nnuevo,Nuevo\n')
+        call_command('import_flans', path, stdout=StringIO())
+        self.assertEqual([flan.slug for flan in get_catalog()], ['nuevo'])
+
+    def test_export_round_trip(self):
+        Flan.objects.create(name='Flan Ñandú', slug='flan-nandu', description='d', price=Decimal('12.50'))
+        for name in ('flans.csv', 'flans.jsonl'):
+            path = os.path.join(self.tmp.name, name)
+            call_command('export_flans', path, stdout=StringIO())
+            Flan.objects.update(name='Cambiado', price=1)
+            call_command('import_flans', path, stdout=StringIO())
+            flan = Flan.objects.get()
+            self.assertEqual((flan.name, flan.price), ('Flan Ñandú', Decimal('12.50')))
+
+
+class SeedLoadDataTests(TestCase):
+    def snapshot(self):
+        return (
+            list(Flan.objects.order_by('slug').values_list('slug', 'price', 'is_private', 'rating_sum', 'review_count')),
+            list(CartItem.objects.order_by('user__username', 'flan__slug').values_list('user__username', 'flan__slug', 'quantity')),
+        )
+
+    def test_deterministic_and_consistent(self):
+        options = {'users': 20, 'flans': 50, 'reviews': 300, 'cart_items': 80, 'batch_size': 7}
+        call_command('seed_load_data', seed=1, stdout=StringIO(), **options)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Review.objects.count(), 300)
+        self.assertEqual(CartItem.objects.count(), 80)
+        self.assertTrue(Flan.objects.filter(is_private=True).exists())
+        # Los agregados desnormalizados se rehacen al final
+        for flan in Flan.objects.all():
+            self.assertEqual(flan.review_count, flan.review_set.count())
+        first = self.snapshot()
+
+        call_command('flush', interactive=False, verbosity=0)
+        call_command('seed_load_data', seed=1, stdout=StringIO(), **options)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_reviews_are_skewed(self):
+        seeding.seed_load_data(users=10, flans=100, reviews=1000, cart_items=0, prefix='skew')
+        counts = sorted(Flan.objects.values_list('review_count', flat=True), reverse=True)
+        # El 10% de los flanes más reseñados concentra la mitad de las reseñas
+        self.assertGreater(sum(counts[:10]), 500)
+
+    def test_same_prefix_twice_fails(self):
+        call_command('seed_load_data', users=1, flans=1, reviews=0, cart_items=0, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('seed_load_data', users=1, flans=1, reviews=0, cart_items=0, stdout=StringIO())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.coco = Flan.objects.create(name='Flan de Coco', slug='coco', description='Con coco rallado', price=100)
+        self.queso = Flan.objects.create(name='Flan de Queso', slug='queso', description='Cremoso, lleva un toque de coco', price=100)
+        self.privado = Flan.objects.create(name='Flan Coco Secreto', slug='secreto', description='d', price=100, is_private=True)
+
+    def slugs(self, response):
+        return [result['slug'] for result in response.json()['results']]
+
+    def test_ranks_name_matches_first(self):
+        response = self.client.get(reverse('buscar_api'), {'q': 'coco'})
+        self.assertEqual(self.slugs(response), ['coco', 'queso'])
+
+    def test_ranks_over_all_matches(self):
+        Flan.objects.bulk_create(
+            Flan(name=f'Postre {i}', slug=f'postre-{i}', description='un flan casero', price=100) for i in range(1500)
+        )
+        search.reindex(Flan.objects.filter(slug__startswith='postre-'))
+        Flan.objects.create(name='Flan', slug='flan', description='d', price=100)
+        self.assertEqual(search.search_flans('flan', limit=5)[0].slug, 'flan')
+
+    def test_prefix_and_accents(self):
+        Flan.objects.create(name='Flan Clásico', slug='clasico', description='d', price=100)
+        response = self.client.get(reverse('buscar_api'), {'q': 'clasi'})
+        self.assertEqual(self.slugs(response), ['clasico'])
+
+    def test_private_flans_only_for_authenticated_users(self):
+        self.assertNotIn('secreto', self.slugs(self.client.get(reverse('buscar_api'), {'q': 'coco'})))
+        self.client.force_login(User.objects.create_user('u', password='x'))
+        self.assertIn('secreto', self.slugs(self.client.get(reverse('buscar_api'), {'q': 'coco'})))
+
+    def test_index_follows_saves_and_deletes(self):
+        self.queso.name = 'Flan de Dulce de Leche'
+        self.queso.description = 'Sin frutas'
+        self.queso.save()
+        self.coco.delete()
+        self.assertEqual(self.slugs(self.client.get(reverse('buscar_api'), {'q': 'coco'})), [])
+        self.assertEqual(self.slugs(self.client.get(reverse('buscar_api'), {'q': 'dulce leche'})), ['queso'])
+
+    def test_query_syntax_is_not_interpreted(self):
+        for query in ('"', 'coco OR', 'NEAR(', '*', '', 'coco -queso'):
+            response = self.client.get(reverse('buscar_api'), {'q': query})
+            self.assertEqual(response.status_code, 200)
+
+    def test_search_page(self):
+        response = self.client.get(reverse('buscar'), {'q': 'queso'})
+        self.assertContains(response, 'Flan de Queso')
+        self.assertNotContains(response, 'Flan de Coco')
+
+    def test_import_and_rebuild_keep_index(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('slug,name,description\nvainilla,Flan de Vainilla,Clásico\n')
+        self.addCleanup(os.unlink, f.name)
+        call_command('import_flans', f.name, stdout=StringIO())
+        self.assertEqual(self.slugs(self.client.get(reverse('buscar_api'), {'q': 'vainilla'})), ['vainilla'])
+        call_command('rebuild_search_index', stdout=StringIO())
+        cache.clear()
+        self.assertEqual(self.slugs(self.client.get(reverse('buscar_api'), {'q': 'vainilla'})), ['vainilla'])
+
+    def test_admin_uses_search_index(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        response = self.client.get(reverse('admin:web_flan_changelist'), {'q': 'rallado'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.coco])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for name, is_private in [('Flan Clásico', False), ('Flan de Coco', False), ('Coco Loco', False), ('Flan Coco Secreto', True)]:
+            Flan.objects.create(name=name, slug=slugify(name), description='d', price=100, is_private=is_private)
+
+    def names(self, query, **kwargs):
+        response = self.client.get(reverse('autocompletar'), {'q': query, **kwargs})
+        return [result['name'] for result in response.json()['results']]
+
+    def test_prefix_of_any_word_name_start_first(self):
+        self.assertEqual(self.names('coc'), ['Coco Loco', 'Flan de Coco'])
+        self.assertEqual(self.names('flan cl'), ['Flan Clásico'])
+
+    def test_accents_and_case_are_ignored(self):
+        self.assertEqual(self.names('CLÁSI'), ['Flan Clásico'])
+        self.assertEqual(self.names('clasi'), ['Flan Clásico'])
+
+    def test_private_flans_only_for_authenticated_users(self):
+        self.assertNotIn('Flan Coco Secreto', self.names('coco'))
+        self.client.force_login(User.objects.create_user('u', password='x'))
+        self.assertIn('Flan Coco Secreto', self.names('coco'))
+
+    def test_private_entries_do_not_hide_public_ones(self):
+        index = autocomplete.PrefixIndex(
+            [(pk, f'Flan Privado {pk}', True) for pk in range(1, autocomplete.MAX_SCANNED + 1)]
+            + [(1000, 'Flan Público', False)]
+        )
+        self.assertEqual(index.suggest('flan'), [(1000, 'Flan Público')])
+        self.assertEqual(len(index.suggest('flan', include_private=True)), autocomplete.DEFAULT_LIMIT)
+        index.add(1000, 'Flan Público', True)
+        self.assertEqual(index.suggest('flan'), [])
+
+    def test_served_from_memory(self):
+        self.names('flan')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('flan', limit=2), ['Flan Clásico', 'Flan de Coco'])
+
+    def test_signals_update_index_incrementally(self):
+        self.names('flan')
+        with self.captureOnCommitCallbacks(execute=True):
+            flan = Flan.objects.create(name='Flan de Queso', slug='queso', description='d', price=100)
+            Flan.objects.get(slug='coco-loco').delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('queso'), ['Flan de Queso'])
+            self.assertEqual(self.names('loco'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            flan.name = 'Flan Napolitano'
+            flan.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('queso'), [])
+            self.assertEqual(self.names('napo'), ['Flan Napolitano'])
+
+    def test_rebuilds_when_another_process_changes_flans(self):
+        self.names('flan')
+        Flan.objects.create(name='Flan Importado', slug='importado', description='d', price=100)
+        # Otro proceso: no vemos sus señales, sólo la versión compartida
+        autocomplete.invalidate()
+        self.assertEqual(self.names('import'), ['Flan Importado'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flan = Flan.objects.create(name='Flan Async', slug='async', description='d', price=100)
+        self.user = User.objects.create_user('async', password='x')
+        Review.objects.create(flan=self.flan, user=self.user, rating=5, comment='Rápido')
+
+    def test_catalog_views_are_async(self):
+        for view in (views.index, views.flans_list, views.detalle_flan, views.reviews):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+
+    async def test_async_client(self):
+        for url in (reverse('index'), reverse('flans_list'), reverse('detalle_flan', args=[self.flan.pk])):
+            response = await self.async_client.get(url)
+            self.assertContains(response, 'Flan Async')
+        response = await self.async_client.get(reverse('reviews'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_reviews_requires_login(self):
+        response = self.client.get(reverse('reviews'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('reviews')}", fetch_redirect_response=False)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('reviews')), 'Rápido')
+
+    async def test_async_conditional_get(self):
+        response = await self.async_client.get(reverse('detalle_flan', args=[self.flan.pk]))
+        not_modified = await self.async_client.get(
+            reverse('detalle_flan', args=[self.flan.pk]), headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_async_queries_are_instrumented(self):
+        with self.assertLogs('web.performance', level='INFO') as logs:
+            await self.async_client.get(reverse('flans_list'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['url_name'], 'flans_list')
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+    def test_async_review_post(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('detalle_flan', args=[self.flan.pk]), {'rating': 4, 'comment': 'Otra'}
+        )
+        self.assertRedirects(response, reverse('detalle_flan', args=[self.flan.pk]), fetch_redirect_response=False)
+        self.flan.refresh_from_db()
+        self.assertEqual(self.flan.review_count, 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CONTACT_NOTIFY_EMAILS=['equipo@example.com'])
+class JobQueueTests(TestCase):
+    contact = {'email': 'cliente@example.com', 'nombre': 'Cliente', 'mensaje': 'Hola'}
+
+    def test_contact_is_enqueued_not_sent(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('contacto'), self.contact)
+        self.assertRedirects(response, reverse('exito_contacto'))
+        self.assertFalse(ContactForm.objects.exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(jobs.run_pending(), (2, 0))
+        self.assertEqual(ContactForm.objects.get().email, 'cliente@example.com')
+        self.assertEqual(mail.outbox[0].to, ['equipo@example.com'])
+        self.assertIn('Hola', mail.outbox[0].body)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+
+    def test_failed_job_is_retried_with_backoff(self):
+        self.client.post(reverse('contacto'), self.contact)
+        jobs.run_pending()
+        notify = Job.objects.get(task='contact.notify')
+        Job.objects.filter(pk=notify.pk).update(status=Job.PENDING, attempts=0)
+        with mock.patch('web.tasks.send_mail', side_effect=OSError('SMTP caído')), self.assertLogs('web.jobs', 'WARNING'):
+            self.assertEqual(jobs.run_pending(), (1, 1))
+        notify.refresh_from_db()
+        self.assertEqual((notify.status, notify.attempts), (Job.PENDING, 1))
+        self.assertIn('SMTP caído', notify.last_error)
+        self.assertGreater(notify.run_at, timezone.now())
+        # El guardado no se repite al reintentar el aviso
+        Job.objects.filter(pk=notify.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.run_pending(), (1, 0))
+        self.assertEqual(ContactForm.objects.count(), 1)
+
+    def test_job_fails_after_max_attempts(self):
+        job = jobs.enqueue('contact.notify', {'contact_id': 0}, max_attempts=2)
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            with self.assertLogs('web.jobs', 'WARNING'):
+                jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('DoesNotExist', job.last_error)
+
+    def test_backoff_grows(self):
+        delays = [jobs.retry_delay(attempt).total_seconds() for attempt in (1, 2, 3)]
+        self.assertLess(delays[0], delays[1])
+        self.assertLess(delays[1], delays[2])
+
+    def test_claimed_jobs_are_not_claimed_twice(self):
+        jobs.enqueue('contact.notify', {'contact_id': 0})
+        self.assertEqual(len(jobs.claim(worker='a')), 1)
+        self.assertEqual(jobs.claim(worker='b'), [])
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue('contact.notify', {'contact_id': 0})
+        jobs.claim(worker='muerto')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - jobs.STALE_AFTER * 2)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(len(jobs.claim(worker='vivo')), 1)
+
+    def test_stale_jobs_without_attempts_left_fail(self):
+        job = jobs.enqueue('contact.notify', {'contact_id': 0}, max_attempts=1)
+        jobs.claim(worker='muerto')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - jobs.STALE_AFTER * 2)
+        self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(jobs.claim(worker='vivo'), [])
+
+    def test_old_done_jobs_are_pruned(self):
+        old, recent = jobs.enqueue('contact.notify', {'contact_id': 0}), jobs.enqueue('contact.notify', {'contact_id': 0})
+        failed = jobs.enqueue('contact.notify', {'contact_id': 0})
+        Job.objects.filter(pk=old.pk).update(status=Job.DONE, finished_at=timezone.now() - jobs.KEEP_DONE * 2)
+        Job.objects.filter(pk=recent.pk).update(status=Job.DONE, finished_at=timezone.now())
+        Job.objects.filter(pk=failed.pk).update(status=Job.FAILED, finished_at=timezone.now() - jobs.KEEP_DONE * 2)
+        self.assertEqual(jobs.prune_done(), 1)
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, failed.pk})
+
+    def test_run_jobs_command(self):
+        self.client.post(reverse('contacto'), self.contact)
+        out = StringIO()
+        call_command('run_jobs', once=True, stdout=out)
+        self.assertIn('Successfully ran 2 jobs (0 failed)', out.getvalue())
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def _seed(self, count):
+        start = User.objects.count()
+        users = [User.objects.create(username=f'cliente{i}') for i in range(start, start + count)]
+        flans = [Flan.objects.create(name=f'Flan {i}', slug=f'flan-admin-{i}', price=100) for i in range(start, start + count)]
+        for user, flan in zip(users, flans):
+            CartItem.objects.create(user=user, flan=flan, quantity=1)
+            Review.objects.create(user=user, flan=flan, rating=5, comment='Rico')
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = [reverse('admin:web_cartitem_changelist'), reverse('admin:web_review_changelist')]
+        self._seed(2)
+        # La primera petición además guarda al usuario en la cache
+        self._queries(urls[0])
+        few = [self._queries(url) for url in urls]
+        self._seed(20)
+        self.assertEqual([self._queries(url) for url in urls], few)
+
+    def test_username_filter_renders_input_not_user_list(self):
+        self._seed(3)
+        url = reverse('admin:web_cartitem_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, 'name="username"')
+        self.assertNotContains(response, '?user__id__exact=')
+
+        response = self.client.get(url, {'username': 'cliente1'})
+        self.assertEqual([item.user.username for item in response.context['cl'].result_list], ['cliente1'])
+
+    def test_estimated_count_paginator(self):
+        self._seed(3)
+        queryset = CartItem.objects.order_by('pk')
+        with mock.patch('web.pagination.estimate_count', return_value=250000), self.assertNumQueries(0):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 250000)
+
+        class Capped(EstimatedCountPaginator):
+            max_count = 2
+
+        # Sin estimación (SQLite) se cuenta con tope
+        self.assertEqual(Capped(queryset, 1).count, 2)
+        self.assertEqual(EstimatedCountPaginator(queryset, 1).count, 3)
+
+    def test_change_form_uses_autocomplete(self):
+        response = self.client.get(reverse('admin:web_review_add'))
+        self.assertContains(response, 'admin-autocomplete')
+
+
+class TemplateFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('cliente', password='x')
+        self.flan = Flan.objects.create(name='Flan Casero', slug='flan-casero', description='Receta original', price=1000)
+
+    def test_templates_use_cached_loader(self):
+        from django.template import engines
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertEqual(type(loader).__module__, 'django.template.loaders.cached')
+
+    def test_product_card_is_cached_until_flan_changes(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('index')), 'Receta original')
+
+        # Sin tocar updated_at la tarjeta sigue saliendo del fragmento
+        Flan.objects.filter(pk=self.flan.pk).update(description='Receta nueva')
+        invalidate_catalog()
+        self.assertContains(self.client.get(reverse('index')), 'Receta original')
+
+        self.flan.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flan.save()
+        self.assertContains(self.client.get(reverse('index')), 'Receta nueva')
+
+    def test_navbar_fragment_keyed_by_static_version(self):
+        from django.core.cache.utils import make_template_fragment_key
+        self.client.get(reverse('about'))
+        version = precache.get_manifest()['version']
+        self.assertIsNotNone(cache.get(make_template_fragment_key('navbar', [version])))
+        # Un despliegue con otros estáticos no reutiliza el fragmento anterior
+        with mock.patch.object(precache, 'get_manifest', return_value={'version': 'nueva', 'assets': []}):
+            self.client.force_login(self.user)
+            self.client.get(reverse('about'))
+        self.assertIsNotNone(cache.get(make_template_fragment_key('navbar', ['nueva'])))
+
+    def test_csrf_forms_are_not_cached(self):
+        self.client.force_login(self.user)
+        token_re = r'name="csrfmiddlewaretoken" value="([^"]+)"'
+        first = re.findall(token_re, self.client.get(reverse('index')).content.decode())
+        second = re.findall(token_re, self.client.get(reverse('index')).content.decode())
+        # Tarjeta y menú del usuario; cada render enmascara el token de nuevo
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+
+
+def fake_image_fetcher(url, size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (210, 140, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ImageThumbnailTests(TestCase):
+    url = 'https://example.com/flan.jpg'
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name, IMAGE_FETCHER='web.tests.fake_image_fetcher')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root.name
+
+    def test_builds_hashed_thumbnails_once(self):
+        fetcher = mock.Mock(side_effect=fake_image_fetcher)
+        manifest, created = images.build_thumbnails(self.url, fetcher)
+        self.assertTrue(created)
+        self.assertEqual((manifest['width'], manifest['height']), (1200, 800))
+        self.assertEqual([width for width, _ in manifest['webp']], [320, 640, 960])
+        for width, name in manifest['jpeg']:
+            self.assertRegex(name, rf'^thumbs/[0-9a-f]{{16}}/{width}w\.[0-9a-f]{{12}}\.jpg$')
+            with Image.open(os.path.join(self.media_root, name)) as thumbnail:
+                self.assertEqual(thumbnail.size, (width, round(width * 2 / 3)))
+        with Image.open(os.path.join(self.media_root, manifest['webp'][0][1])) as thumbnail:
+            self.assertEqual(thumbnail.format, 'WEBP')
+
+        # Sin cache el manifiesto sale del disco y no se vuelve a descargar
+        cache.clear()
+        self.assertEqual(images.build_thumbnails(self.url, fetcher), (manifest, False))
+        self.assertEqual(fetcher.call_count, 1)
+
+    def test_small_images_are_not_upscaled(self):
+        manifest, _ = images.build_thumbnails(self.url, lambda url: fake_image_fetcher(url, (200, 100)))
+        self.assertEqual([width for width, _ in manifest['jpeg']], [200])
+
+    def test_flan_save_enqueues_thumbnails_and_cards_use_srcset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Flan.objects.create(name='Flan Uno', slug='flan-uno', description='Uno', price=100, image_url=self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Flan.objects.create(name='Flan Dos', slug='flan-dos', description='Dos', price=100, image_url=self.url)
+        self.assertEqual(Job.objects.filter(task='images.thumbnails').count(), 1)
+        self.assertContains(self.client.get(reverse('flans_list')), f'src="{self.url}"')
+
+        jobs.run_pending()
+        response = self.client.get(reverse('flans_list'))
+        self.assertContains(response, '<source type="image/webp" srcset="/media/thumbs/', count=2)
+        self.assertContains(response, 'sizes="(max-width: 768px) 100vw, 300px"')
+        self.assertNotContains(response, f'src="{self.url}"')
+
+    @override_settings(SHARED_CACHE=False)
+    def test_worker_does_not_invalidate_per_process_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flan = Flan.objects.create(name='Flan Uno', slug='flan-uno', description='Uno', price=100, image_url=self.url)
+        version = get_version(catalog_namespace(False))
+        jobs.run_pending()
+        self.assertEqual(get_version(catalog_namespace(False)), version)
+        self.assertGreater(Flan.objects.get(pk=flan.pk).updated_at, flan.updated_at)
+
+    def test_search_results_use_thumbnails(self):
+        Flan.objects.create(name='Flan Uno', slug='flan-uno', description='Uno', price=100, image_url=self.url)
+        images.build_thumbnails(self.url)
+        response = self.client.get(reverse('buscar'), {'q': 'uno'})
+        self.assertContains(response, '<source type="image/webp" srcset="/media/thumbs/', count=1)
+        self.assertNotContains(response, f'src="{self.url}"')
+
+    def test_thumbnail_view_sets_long_cache(self):
+        manifest, _ = images.build_thumbnails(self.url)
+        name = manifest['webp'][0][1]
+        response = self.client.get('/media/' + name)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        manifest_path = name.rsplit('/', 1)[0].removeprefix('thumbs/') + '/manifest.json'
+        self.assertEqual(self.client.get(reverse('thumbnail', args=[manifest_path])).status_code, 404)
+
+    def test_build_thumbnails_command(self):
+        Flan.objects.create(name='Flan Uno', slug='flan-uno', description='Uno', price=100, image_url=self.url)
+        out = StringIO()
+        call_command('build_thumbnails', stdout=out)
+        self.assertIn('Successfully built thumbnails for 1 images (0 failed)', out.getvalue())
+        self.assertIsNotNone(images.get_manifest(self.url))
+
+
+class BundledManifestStorage(assets.CSSBundleMixin, ManifestStaticFilesStorage):
+    pass
+
+
+class CSSBundleTests(TestCase):
+    def tearDown(self):
+        assets.load_critical.cache_clear()
+
+    def test_minify_css(self):
+        css = """
+        /* comentario */
+        @media screen and (max-width: 768px) {
+            .a > .b , .c  { content: "  ; } /* "; color: red ; }
+        }
+        """
+        self.assertEqual(
+            assets.minify_css(css),
+            '@media screen and (max-width:768px){.a>.b,.c{content:"  ; } /* ";color:red}}',
+        )
+
+    def test_bundle_hoists_imports(self):
+        files = {name: '.x { color: red; }' for name in assets.CSS_FILES}
+        files[assets.CSS_FILES[1]] = "@import url('https://fonts.example.com/a.css');\n.y { margin: 0 }"
+        bundle = assets.build_bundle(files.__getitem__)
+        self.assertTrue(bundle.startswith("@import url('https://fonts.example.com/a.css');.x{color:red}"))
+        self.assertIn('.y{margin:0}', bundle)
+
+    def test_extract_critical_keeps_rules_used_by_template(self):
+        css = assets.minify_css("""
+            :root { --c: red }
+            .card { animation: fade 1s }
+            .card .unused { color: blue }
+            nav a:hover, .missing { color: red }
+            table { width: 100% }
+            @media (max-width: 768px) { .card { width: 100% } .modal { top: 0 } }
+            @media print { .card { display: none } }
+            @keyframes fade { from { opacity: 0 } }
+            @keyframes spin { to { transform: rotate(1turn) } }
+        """)
+        tokens = {'classes': {'card'}, 'ids': set(), 'tags': {'nav', 'a', 'div'}}
+        self.assertEqual(
+            assets.extract_critical(css, tokens),
+            ':root{--c:red}.card{animation:fade 1s}nav a:hover,.missing{color:red}'
+            '@media (max-width:768px){.card{width:100%}}@keyframes fade{from{opacity:0}}',
+        )
+        self.assertEqual(assets.extract_critical(css, tokens, max_bytes=20), ':root{--c:red}')
+
+    def test_template_tokens_follow_extends_and_includes(self):
+        tokens = assets.template_tokens('flans_list.html')
+        self.assertIn('product-card__title', tokens['classes'])   # flans_list.html
+        self.assertIn('navbar-custom', tokens['classes'])         # base.html
+        self.assertIn('main-content', tokens['ids'])
+        self.assertIn('index.html', assets.page_templates())
+        self.assertNotIn('base.html', assets.page_templates())
+
+    def test_without_bundle_links_each_stylesheet(self):
+        response = self.client.get(reverse('about'))
+        for name in assets.CSS_FILES:
+            self.assertContains(response, f'href="/static/{name}"')
+
+    def test_collectstatic_builds_hashed_bundle_and_inlines_critical_css(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'web.tests.BundledManifestStorage'},
+            },
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(static_root, 'staticfiles.json')) as file:
+                hashed = json.load(file)['paths']
+            self.assertRegex(hashed[assets.BUNDLE_NAME], r'^web/css/bundle\.[0-9a-f]{12}\.css$')
+
+            assets.load_critical.cache_clear()
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, '<style>:root{')
+        self.assertContains(response, '.product-card{')
+        self.assertContains(response, f'<link rel="preload" href="/static/{hashed[assets.BUNDLE_NAME]}" as="style"')
+        self.assertNotContains(response, 'href="/static/web/css/base.css"')
+
+
+class ServiceWorkerTests(TestCase):
+    hashed_files = {
+        'web/css/bundle.css': 'web/css/bundle.0123456789ab.css',
+        'web/css/base.css': 'web/css/base.aaaaaaaaaaaa.css',
+        'web/js/main.js': 'web/js/main.bbbbbbbbbbbb.js',
+        'flan.ico': 'flan.cccccccccccc.ico',
+        'admin/js/core.js': 'admin/js/core.dddddddddddd.js',
+    }
+
+    def tearDown(self):
+        precache.get_manifest.cache_clear()
+
+    def _url(self, name):
+        return '/static/' + self.hashed_files[name]
+
+    def test_manifest_lists_hashed_assets(self):
+        manifest = precache.build_manifest(self.hashed_files, self._url)
+        self.assertEqual(manifest['assets'], [
+            {'url': '/static/flan.cccccccccccc.ico', 'revision': 'cccccccccccc'},
+            {'url': '/static/web/css/bundle.0123456789ab.css', 'revision': '0123456789ab'},
+            {'url': '/static/web/js/main.bbbbbbbbbbbb.js', 'revision': 'bbbbbbbbbbbb'},
+        ])
+        # La versión sólo cambia si cambia un archivo precacheado
+        unrelated = dict(self.hashed_files, **{'admin/js/core.js': 'admin/js/core.eeeeeeeeeeee.js'})
+        self.assertEqual(precache.build_manifest(unrelated, lambda name: '/static/' + unrelated[name])['version'], manifest['version'])
+        changed = dict(self.hashed_files, **{'web/js/main.js': 'web/js/main.ffffffffffff.js'})
+        self.assertNotEqual(precache.build_manifest(changed, lambda name: '/static/' + changed[name])['version'], manifest['version'])
+
+    def test_service_worker_without_manifest_precaches_nothing(self):
+        response = self.client.get('/sw.js')
+        self.assertEqual(response['Content-Type'], 'application/javascript')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertContains(response, "const VERSION = 'dev';")
+        self.assertContains(response, 'const PRECACHE = [];')
+
+    def test_service_worker_uses_collected_manifest(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'web.tests.BundledManifestStorage'},
+            },
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(static_root, 'staticfiles.json')) as file:
+                hashed = json.load(file)['paths']
+            precache.get_manifest.cache_clear()
+            content = self.client.get(reverse('service_worker')).content.decode()
+        assets_json = re.search(r'const PRECACHE = (.*);', content).group(1)
+        urls = [asset['url'] for asset in json.loads(assets_json)]
+        self.assertIn('/static/' + hashed['web/css/bundle.css'], urls)
+        self.assertIn('/static/' + hashed['web/js/main.js'], urls)
+        self.assertNotIn("const VERSION = 'dev';", content)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TransactionTestCase):
+    # En los tests "replica" es un espejo de default: ve los mismos datos y
+    # sólo cambia la conexión por la que se leen
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('cliente', password='x')
+        self.flan = Flan.objects.create(name='Flan Casero', slug='flan-casero', description='Rico', price=1000)
+
+    def _replica_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connections['replica']) as queries:
+            self.assertEqual(client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_catalog_and_review_reads_go_to_replica(self):
+        self.assertEqual(Flan.objects.all().db, 'replica')
+        self.assertEqual(Review.objects.all().db, 'replica')
+        self.assertEqual(CartItem.objects.all().db, 'default')
+        self.assertEqual(User.objects.all().db, 'default')
+        with transaction.atomic():
+            self.assertEqual(Flan.objects.all().db, 'default')
+        with routers.use_primary():
+            self.assertEqual(Flan.objects.all().db, 'default')
+
+    def test_writes_stick_the_client_to_the_primary(self):
+        url = reverse('detalle_flan', args=[self.flan.pk])
+        self.client.force_login(self.user)
+        self.assertGreater(self._replica_queries(self.client, url), 0)
+
+        response = self.client.post(reverse('add_to_cart', args=[self.flan.pk]))
+        self.assertEqual(response.cookies['use_primary']['max-age'], 5)
+        self.assertEqual(self._replica_queries(self.client, url), 0)
+
+        # Otro cliente sigue leyendo de la réplica
+        other = Client()
+        other.force_login(self.user)
+        self.assertGreater(self._replica_queries(other, url), 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_default(self):
+        self.assertEqual(Flan.objects.all().db, 'default')
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('add_to_cart', args=[self.flan.pk]))
+        self.assertNotIn('use_primary', response.cookies)
+
+
+
+@override_settings(DATABASE_REPLICAS=['lagging'])
+class LaggingReplicaTests(TransactionTestCase):
+    # Una réplica de verdad separada, que se quedó con los datos de antes del
+    # último cambio: lo que lee de ella sale viejo
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        connections.settings['lagging'] = dict(connections.settings['default'], NAME=':memory:')
+        self.addCleanup(self._drop_replica)
+        with connections['lagging'].schema_editor() as editor:
+            editor.create_model(Flan)
+            editor.create_model(Review)
+        self.flan = Flan.objects.create(name='Flan Casero', slug='flan-casero', description='Rico', price=1000)
+        Flan.objects.using('lagging').bulk_create([Flan.objects.using('default').get(pk=self.flan.pk)])
+        self.flan.name = 'Flan Renovado'
+        self.flan.save()
+
+    def _drop_replica(self):
+        connections['lagging'].close()
+        del connections['lagging']
+        del connections.settings['lagging']
+
+    def test_uncached_reads_see_the_lag(self):
+        self.assertEqual(Flan.objects.get(pk=self.flan.pk).name, 'Flan Casero')
+
+    def test_review_edits_read_the_previous_rating_from_the_primary(self):
+        user = User.objects.create_user('critico', password='x')
+        review = Review.objects.create(flan=self.flan, user=user, rating=2, comment='Regular')
+        # La réplica no tiene la tabla de usuarios: sin comprobar claves foráneas
+        with connections['lagging'].constraint_checks_disabled():
+            Review.objects.using('lagging').bulk_create([Review.objects.using('default').get(pk=review.pk)])
+        for rating in (4, 5):
+            review.rating = rating
+            review.save()
+        flan = Flan.objects.using('default').get(pk=self.flan.pk)
+        self.assertEqual((flan.rating_sum, flan.review_count), (5, 1))
+
+    def test_caches_are_filled_from_the_primary(self):
+        self.assertEqual([flan.name for flan in get_catalog()], ['Flan Renovado'])
+        self.assertEqual([flan.name for flan in async_to_sync(aget_catalog_page)().object_list], ['Flan Renovado'])
+        self.assertEqual(autocomplete.suggest('ren'), [(self.flan.pk, 'Flan Renovado')])
+        for _ in range(2):
+            response = self.client.get(reverse('index'))
+            self.assertContains(response, 'Flan Renovado')
+            self.assertNotContains(response, 'Flan Casero')
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('cacheado', password='12345')
+        self.client.login(username='cacheado', password='12345')
+
+    def _user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries if 'FROM "auth_user"' in q['sql']]
+
+    def test_logged_in_pages_skip_user_query(self):
+        for name in ('carrito', 'reviews', 'welcome'):
+            self._user_queries(reverse(name))
+            self.assertEqual(self._user_queries(reverse(name)), [], name)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_per_process_cache_always_reads_the_user(self):
+        self._user_queries(reverse('welcome'))
+        self.assertEqual(len(self._user_queries(reverse('welcome'))), 1)
+
+    def test_cached_user_renders_username(self):
+        self.client.get(reverse('about'))
+        response = self.client.get(reverse('about'))
+        self.assertContains(response, 'cacheado')
+
+    def test_password_change_logs_out_other_sessions(self):
+        self.client.get(reverse('welcome'))
+        self.user.set_password('nueva')
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('welcome')).status_code, 302)
+
+    def test_user_save_refreshes_cache(self):
+        self.client.get(reverse('welcome'))
+        self.user.username = 'renombrado'
+        self.user.save()
+        self.assertEqual(len(self._user_queries(reverse('about'))), 1)
+        self.assertContains(self.client.get(reverse('about')), 'renombrado')
+
+    def test_inactive_user_is_logged_out(self):
+        self.client.get(reverse('welcome'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('welcome')).status_code, 302)
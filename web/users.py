@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.core.cache import cache
+
+from .caching import bump_version, cache_is_shared, versioned_key
+from .instrumentation import record_cache
+
+# El usuario de la sesión servido desde la cache en vez de leerlo de la base de
+# datos en cada petición (CachedAuthenticationMiddleware). La clave lleva el id
+# y el hash de autenticación de la sesión, y sólo se guarda un usuario después
+# de que django.contrib.auth haya validado ese hash contra su contraseña.
+#
+# Guardar o borrar el usuario (cambio de contraseña, is_active, last_login...)
+# incrementa la versión de su espacio de nombres (ver web/signals.py): la
+# siguiente petición lo vuelve a leer y a validar. Un QuerySet.update() sobre
+# User no manda señales; hay que llamar a invalidate_user() a mano.
+#
+# Esa invalidación tiene que llegar a todos los procesos: sin una cache
+# compartida (caching.cache_is_shared()) el usuario se lee siempre de la base de
+# datos, porque otro worker seguiría aceptando a un usuario desactivado o con la
+# contraseña cambiada hasta que expirara su entrada.
+
+USER_CACHE_TIMEOUT = getattr(settings, 'USER_CACHE_TIMEOUT', 60 * 15)
+
+
+def user_namespace(user_id):
+    return f'user:{user_id}'
+
+
+def invalidate_user(user_id):
+    bump_version(user_namespace(user_id))
+
+
+def get_user(request):
+    """Como django.contrib.auth.get_user, con el usuario cacheado."""
+    if not cache_is_shared():
+        return auth.get_user(request)
+    session = request.session
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not session_hash or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    key = versioned_key(user_namespace(user_id), session_hash)
+    user = cache.get(key)
+    record_cache(user is not None)
+    if user is not None:
+        return user
+    user = auth.get_user(request)
+    # Si el hash no coincidía, auth.get_user cerró la sesión y no hay nada que guardar
+    if user.is_authenticated and user.pk == user_id:
+        cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
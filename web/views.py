@@ -1,33 +1,103 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.db.models import Max
+from django.utils.cache import patch_cache_control
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.views.static import serve
 from .models import Flan, CartItem, Review
 from .forms import ContactFormForm, UserRegisterForm, ReviewForm
+from .caching import aget_catalog, aget_catalog_page, aget_version, catalog_namespace, get_catalog
+from .pagination import CursorPaginator
+from .decorators import async_condition, async_login_required, auser
+from .page_cache import ais_cacheable_request, cache_page_for_anonymous
+from . import autocomplete, cart, images, jobs, precache, search
+
+REVIEWS_PER_PAGE = 10
+MAX_CART_QUANTITY = 99
+MAX_SEARCH_RESULTS = 50
+
+# Validadores de peticiones condicionales. Sólo aplican a visitantes anónimos,
+# cuya página es la misma para todos; cada función hace a lo sumo una consulta
+# por petición (el resultado se guarda en el request).
+
+async def _catalog_updated_at(request):
+    if not hasattr(request, '_catalog_updated_at'):
+        request._catalog_updated_at = None
+        if await ais_cacheable_request(request):
+            aggregate = await Flan.objects.filter(is_private=False).aaggregate(latest=Max('updated_at'))
+            request._catalog_updated_at = aggregate['latest']
+    return request._catalog_updated_at
+
+
+async def _catalog_etag(request, *args, **kwargs):
+    updated_at = await _catalog_updated_at(request)
+    if updated_at is None:
+        return None
+    # Borrar un flan no mueve el máximo de updated_at, pero sí la versión
+    version = await aget_version(catalog_namespace(False))
+    return f'"catalog-{version}-{updated_at.timestamp()}"'
+
+
+async def _flan_updated_at(request, flan_id):
+    if not hasattr(request, '_flan_updated_at'):
+        request._flan_updated_at = None
+        if await ais_cacheable_request(request):
+            request._flan_updated_at = await (
+                Flan.objects.filter(pk=flan_id, is_private=False)
+                .values_list('updated_at', flat=True)
+                .afirst()
+            )
+    return request._flan_updated_at
+
+
+async def _flan_etag(request, flan_id):
+    updated_at = await _flan_updated_at(request, flan_id)
+    if updated_at is None:
+        return None
+    return f'"flan-{flan_id}-{updated_at.timestamp()}"'
+
+
+# index, flans_list, detalle_flan y reviews son async: con ASGI atienden las
+# lecturas del catálogo en el event loop (ORM y cache async) en vez de ocupar
+# un hilo por petición. render() toca la sesión y los context processors de
+# forma síncrona, así que se ejecuta con sync_to_async.
 
-def index(request):
-    flanes_publicos = Flan.objects.filter(is_private=False)
-    return render(request, 'index.html', {'flanes': flanes_publicos})
+arender = sync_to_async(render)
 
+
+@cache_page_for_anonymous(tags=['catalog'])
+@async_condition(etag_func=_catalog_etag)
+async def index(request):
+    flanes_publicos = await aget_catalog(is_private=False)
+    return await arender(request, 'index.html', {'flanes': flanes_publicos})
+
+@cache_page_for_anonymous()
 def about(request):
     return render(request, 'about.html')
 
 @login_required
 def welcome(request):
-    flanes_privados = Flan.objects.filter(is_private=True)
+    flanes_privados = get_catalog(is_private=True)
     return render(request, 'welcome.html', {'flanes': flanes_privados})
 
-def flans_list(request):
-    flans = Flan.objects.filter(is_private=False).order_by('name')
-    paginator = Paginator(flans, 10)  # Show 10 flans per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return render(request, 'flans_list.html', {'page_obj': page_obj})
+@cache_page_for_anonymous(tags=['catalog'])
+@async_condition(etag_func=_catalog_etag)
+async def flans_list(request):
+    page_obj = await aget_catalog_page(request.GET.get('cursor'), per_page=10)
+    return await arender(request, 'flans_list.html', {'page_obj': page_obj})
 
 def contacto(request):
     if request.method == 'POST':
         form = ContactFormForm(request.POST)
         if form.is_valid():
-            form.save()
+            # Guardar y avisar por correo queda para el worker (run_jobs)
+            jobs.enqueue('contact.persist', form.cleaned_data)
             return redirect('exito_contacto')
     else:
         form = ContactFormForm()
@@ -36,27 +106,48 @@ def contacto(request):
 def exito_contacto(request):
     return render(request, 'exito_contacto.html')
 
-@login_required
 def ver_carrito(request):
+    if not request.user.is_authenticated:
+        return _ver_carrito_invitado(request)
     cart_items = CartItem.objects.filter(user=request.user).select_related('flan')
-    cart_total = sum(item.flan.price * item.quantity for item in cart_items)  # Updated to use flan.price
+    cart_total = cart.get_cart_summary(request.user)['total']
     context = {
         'cart_items': cart_items,
         'cart_total': cart_total
     }
     return render(request, 'carrito.html', context)
 
-@login_required
+def _ver_carrito_invitado(request):
+    flans = Flan.objects.in_bulk(list(request.guest_cart.items))
+    # Filas sin guardar: la plantilla las trata igual que las de CartItem
+    cart_items = [
+        CartItem(flan=flans[flan_id], quantity=quantity)
+        for flan_id, quantity in request.guest_cart.items.items()
+        if flan_id in flans
+    ]
+    cart_total = sum(item.flan.price * item.quantity for item in cart_items)
+    return render(request, 'carrito.html', {'cart_items': cart_items, 'cart_total': cart_total})
+
 def add_to_cart(request, flan_id):
-    flan = get_object_or_404(Flan, id=flan_id)
-    cart_item, created = CartItem.objects.get_or_create(user=request.user, flan=flan)
-    if not created:
-        cart_item.quantity += 1
-        cart_item.save()
+    try:
+        quantity = max(1, min(int(request.POST.get('quantity', 1)), MAX_CART_QUANTITY))
+    except ValueError:
+        quantity = 1
+    if request.user.is_authenticated:
+        if not cart.add_to_cart(request.user, flan_id, quantity):
+            raise Http404("Flan no encontrado")
+    else:
+        # Invitados: el carrito va en una cookie firmada, sin escribir en la BD
+        if not Flan.objects.filter(id=flan_id, is_private=False).exists():
+            raise Http404("Flan no encontrado")
+        request.guest_cart.add(flan_id, quantity)
     return redirect('carrito')
 
-@login_required
 def remove_from_cart(request, item_id):
+    if not request.user.is_authenticated:
+        # En el carrito de invitado el identificador es el del flan
+        request.guest_cart.remove(item_id)
+        return redirect('carrito')
     cart_item = get_object_or_404(CartItem, id=item_id, user=request.user)
     cart_item.delete()
     return redirect('carrito')
@@ -72,29 +163,147 @@ def register(request):
     return render(request, 'register.html', {'form': form})
 
 
-def detalle_flan(request, flan_id):
-    flan = get_object_or_404(Flan, id=flan_id)
+def _flan_page_tags(request, flan_id):
+    return [f'flan:{flan_id}']
+
+
+@cache_page_for_anonymous(tags=_flan_page_tags)
+@async_condition(etag_func=_flan_etag, last_modified_func=_flan_updated_at)
+async def detalle_flan(request, flan_id):
+    try:
+        flan = await Flan.objects.aget(id=flan_id)
+    except Flan.DoesNotExist:
+        raise Http404("Flan no encontrado")
 
     # Verificar permisos: flanes privados solo para usuarios autenticados
-    if flan.is_private and not request.user.is_authenticated:
-        from django.http import Http404
+    user = await auser(request)
+    if flan.is_private and not user.is_authenticated:
         raise Http404("Flan no encontrado")
 
-    reviews = Review.objects.filter(flan=flan).select_related('user')
-    if request.method == 'POST' and request.user.is_authenticated:
+    reviews = await _flan_reviews_paginator(flan).aget_page(request.GET.get('cursor'))
+    if request.method == 'POST' and user.is_authenticated:
         form = ReviewForm(request.POST)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             review = form.save(commit=False)
             review.flan = flan
-            review.user = request.user
-            review.save()
+            review.user = user
+            await review.asave()
             return redirect('detalle_flan', flan_id=flan.id)
     else:
         form = ReviewForm()
-    return render(request, 'flan_detail.html', {'flan': flan, 'reviews': reviews, 'form': form})
+    return await arender(request, 'flan_detail.html', {'flan': flan, 'reviews': reviews, 'form': form})
 
 
-@login_required
-def reviews(request):
-    user_reviews = Review.objects.filter(user=request.user).select_related('flan')
-    return render(request, 'reviews.html', {'reviews': user_reviews})
+@cache_page_for_anonymous(tags=_flan_page_tags)
+def detalle_flan_reviews(request, flan_id):
+    """Siguiente tramo de reseñas de un flan como fragmento HTML en JSON."""
+    flan = get_object_or_404(Flan.objects.only('id', 'is_private'), id=flan_id)
+    if flan.is_private and not request.user.is_authenticated:
+        raise Http404("Flan no encontrado")
+
+    reviews = _flan_reviews_paginator(flan).get_page(request.GET.get('cursor'))
+    html = render_to_string('review_items.html', {'reviews': reviews}, request=request)
+    return JsonResponse({
+        'html': html,
+        'next_cursor': reviews.next_cursor,
+        'has_next': reviews.has_next(),
+    })
+
+
+def _flan_reviews_paginator(flan):
+    return CursorPaginator(
+        Review.objects.filter(flan=flan).select_related('user'),
+        ordering=('-created_at', '-id'),
+        per_page=REVIEWS_PER_PAGE,
+    )
+
+
+@async_login_required
+async def reviews(request):
+    user_reviews = await CursorPaginator(
+        Review.objects.filter(user=request.user).select_related('flan'),
+        ordering=('-created_at', '-id'),
+        per_page=REVIEWS_PER_PAGE,
+    ).aget_page(request.GET.get('cursor'))
+    return await arender(request, 'reviews.html', {'reviews': user_reviews})
+
+
+def _search_results(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', search.DEFAULT_LIMIT)), MAX_SEARCH_RESULTS))
+    except ValueError:
+        limit = search.DEFAULT_LIMIT
+    # Los flanes privados sólo aparecen para usuarios autenticados
+    include_private = request.user.is_authenticated
+    return query, search.search_flans(query, include_private=include_private, limit=limit)
+
+
+@cache_page_for_anonymous(tags=['catalog'])
+def buscar(request):
+    query, flans = _search_results(request)
+    return render(request, 'buscar.html', {'query': query, 'flanes': flans})
+
+
+@cache_page_for_anonymous(tags=['catalog'])
+def buscar_api(request):
+    query, flans = _search_results(request)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'id': flan.id,
+                'name': flan.name,
+                'slug': flan.slug,
+                'description': flan.description,
+                'price': str(flan.price),
+                'average_rating': flan.average_rating,
+                'url': reverse('detalle_flan', args=[flan.id]),
+            }
+            for flan in flans
+        ],
+    })
+
+
+def autocompletar(request):
+    """Sugerencias de nombres desde el índice en memoria, sin consultas."""
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', autocomplete.DEFAULT_LIMIT)), MAX_SEARCH_RESULTS))
+    except ValueError:
+        limit = autocomplete.DEFAULT_LIMIT
+    suggestions = autocomplete.suggest(query, include_private=request.user.is_authenticated, limit=limit)
+    response = JsonResponse({
+        'query': query,
+        'results': [
+            {'id': pk, 'name': name, 'url': reverse('detalle_flan', args=[pk])}
+            for pk, name in suggestions
+        ],
+    })
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+
+THUMBNAIL_EXTENSIONS = tuple(f'.{extension}' for _, extension, _ in images.FORMATS.values())
+
+
+def thumbnail(request, path):
+    """Miniaturas de web/images.py. El nombre lleva el hash del contenido, así
+    que se pueden cachear por un año."""
+    if not path.endswith(THUMBNAIL_EXTENSIONS):
+        raise Http404
+    response = serve(request, f'{images.THUMBNAIL_DIR}/{path}', document_root=settings.MEDIA_ROOT)
+    patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    return response
+
+
+def service_worker(request):
+    """Service worker servido desde la raíz para que controle todo el sitio."""
+    manifest = precache.get_manifest()
+    response = HttpResponse(
+        render_to_string('sw.js', {'version': manifest['version'], 'assets': json.dumps(manifest['assets'])}),
+        content_type='application/javascript',
+    )
+    # El navegador debe notar enseguida una versión nueva
+    patch_cache_control(response, no_cache=True)
+    return response